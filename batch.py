@@ -0,0 +1,128 @@
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from crawler import HostRateLimiter
+from http_cache import HttpCache
+from pipeline import run_pipeline
+from process import llm_cache
+from store import ContentStore
+
+JOURNAL_NAME = 'batch_journal.jsonl'
+
+def load_jobs(path):
+    """(issue, city_county, state) jobs from a CSV with a header row, or from JSONL.
+
+    The jurisdiction column may be called city_county or jurisdiction.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return [(row['issue'], row.get('city_county') or row['jurisdiction'], row['state']) for row in rows]
+
+def job_id(issue, city_county, state):
+    return re.sub(r'[^a-z0-9]+', '-', f"{state} {city_county} {issue}".lower()).strip('-')
+
+class BatchRunner:
+    """Runs pipeline jobs concurrently, each writing to its own directory under `output_root`.
+
+    Every job shares the HTTP cache, the per-host crawl limiter, the content
+    store for `crawled_directory`, and (through process.py) the LLM client,
+    rate limiter and response cache, so limits are global across jobs. Finished jobs are appended to a journal; a rerun skips
+    them and retries anything that failed or never finished.
+    """
+
+    def __init__(self, output_root='batch_output', max_jobs=4, crawled_directory='crawled_pages'):
+        self.output_root = output_root
+        self.max_jobs = max_jobs
+        self.crawled_directory = crawled_directory
+        self.cache = HttpCache()
+        self.limiter = HostRateLimiter(1)
+        self.store = ContentStore(crawled_directory)
+        self.journal_path = os.path.join(output_root, JOURNAL_NAME)
+        self.journal_lock = threading.Lock()
+        os.makedirs(output_root, exist_ok=True)
+
+    def completed(self):
+        done = set()
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    if entry.get('status') == 'done':
+                        done.add(entry['job'])
+        except OSError:
+            pass
+        return done
+
+    def record(self, entry):
+        with self.journal_lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def run_job(self, issue, city_county, state):
+        name = job_id(issue, city_county, state)
+        start = time.time()
+        try:
+            outputs = run_pipeline(issue, city_county, state, output_dir=os.path.join(self.output_root, name),
+                                   crawled_directory=self.crawled_directory, cache=self.cache, limiter=self.limiter,
+                                   store=self.store)
+            entry = {'job': name, 'status': 'done', **outputs}
+        except Exception as e:
+            traceback.print_exc()
+            entry = {'job': name, 'status': 'failed', 'error': str(e)}
+        entry.update({'issue': issue, 'city_county': city_county, 'state': state,
+                      'seconds': round(time.time() - start, 1)})
+        self.record(entry)
+        return entry
+
+    def run(self, jobs):
+        done = self.completed()
+        pending = [job for job in jobs if job_id(*job) not in done]
+        print(f"{len(jobs)} jobs, {len(jobs) - len(pending)} already done, {len(pending)} to run")
+
+        start = time.time()
+        finished = failed = 0
+        with ThreadPoolExecutor(max_workers=self.max_jobs) as executor:
+            futures = [executor.submit(self.run_job, *job) for job in pending]
+            for future in as_completed(futures):
+                entry = future.result()
+                finished += 1
+                failed += entry['status'] != 'done'
+                hours = (time.time() - start) / 3600
+                print(f"[batch] {entry['job']}: {entry['status']} in {entry['seconds']}s "
+                      f"({finished}/{len(pending)}, {finished / hours:.1f} jobs/hour)")
+
+        elapsed = time.time() - start
+        rate = finished / (elapsed / 3600) if elapsed else 0.0
+        print(f"Batch finished: {finished - failed} done, {failed} failed in {elapsed:.0f}s ({rate:.1f} jobs/hour)")
+        self.cache.report()
+        llm_cache.report()
+        return finished, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ordinance pipeline for many jurisdictions.")
+    parser.add_argument('jobs', help="CSV or JSONL with issue, city_county (or jurisdiction) and state")
+    parser.add_argument('--output', default='batch_output')
+    parser.add_argument('--max-jobs', type=int, default=4, help="jobs running at once")
+    parser.add_argument('--crawled-directory', default='crawled_pages')
+    args = parser.parse_args()
+
+    runner = BatchRunner(args.output, args.max_jobs, args.crawled_directory)
+    runner.run(load_jobs(args.jobs))
+
+if __name__ == "__main__":
+    main()
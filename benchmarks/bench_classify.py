@@ -0,0 +1,58 @@
+"""Classification throughput vs concurrency against a local fake OpenAI server.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_classify --documents 40 --latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import logging
+import tempfile
+import time
+
+from openai import OpenAI
+
+import llm
+import process
+from benchmarks.fake_openai import FakeOpenAI
+from store import ContentStore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rpm", type=int, default=None, help="server-side requests/minute limit")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    logging.getLogger("process").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server = FakeOpenAI(latency=args.latency, requests_per_minute=args.rpm)
+    llm.set_client(OpenAI(base_url=server.base_url, api_key="local-benchmark"))
+    process.llm_cache = None  # every run should reach the server
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ContentStore(root)
+        for n in range(args.documents):
+            text = f"Humboldt County Code Sec. {n}. Short-term rentals require a permit. " * 50
+            store.save_page(f"https://humboldtgov.org/code/{n}", f"<p>{text}</p>", text)
+
+        for concurrency in args.concurrency:
+            process.rate_limiter = process.RateLimiter()
+            before_429 = server.rate_limited
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results, _ = process.process_files(root, "short term rental", "Humboldt County", "CA",
+                                                   concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+            assert [r["url"] for r in results] == sorted(r["url"] for r in results)
+            print(f"concurrency {concurrency:>3}: {len(results) / elapsed:6.1f} docs/sec "
+                  f"({elapsed:.2f}s, {server.rate_limited - before_429} responses were 429)")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
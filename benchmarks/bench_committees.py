@@ -0,0 +1,85 @@
+"""Committee lookup per hearing: scanning the collection on every call vs committees.CommitteeDirectory.
+
+Uses an in-memory stand-in for the committeesAndSubcommittees collection
+that sleeps --latency seconds per query, like a round trip to Atlas. The
+scan path also pays one more round trip for the ping the old
+get_committee sent. Run from the repository root:
+
+    python -m benchmarks.bench_committees --committees 250 --hearings 500
+"""
+import argparse
+import random
+import time
+
+from committees import CommitteeDirectory, normalize_netloc
+
+
+class FixtureCollection:
+    def __init__(self, documents, latency):
+        self.documents = documents
+        self.latency = latency
+        self.queries = 0
+
+    def find(self, query=None, projection=None):
+        time.sleep(self.latency)
+        self.queries += 1
+        return [dict(document) for document in self.documents
+                if all(document.get(key) == value for key, value in (query or {}).items())]
+
+
+def make_committees(count):
+    committees = []
+    for n in range(count):
+        committees.append({
+            "thomas_id": f"HS{n:02d}",
+            "name": f"Committee {n}",
+            "url": f"https://www.committee{n}.house.gov/",
+            "minority_url": f"https://minority-committee{n}.house.gov/" if n % 2 else None,
+            "subcommittees": [{"name": f"Subcommittee {n}-{s}", "thomas_id": f"{s:02d}"} for s in range(6)],
+        })
+    return committees
+
+
+def scan_lookup(collection, url, latency):
+    # What get_committee did per call: ping, query everything, normalize every URL in Python
+    time.sleep(latency)
+    for committee in collection.find({}):
+        if any(committee.get(key) and normalize_netloc(committee[key]) == normalize_netloc(url)
+               for key in ("url", "minority_url")):
+            subcommittee_dict = {s["name"]: s["thomas_id"] for s in committee.get("subcommittees", [])}
+            subcommittee_dict["Full Committee"] = ""
+            return {"committee_id": committee["thomas_id"], "committee": committee["name"],
+                    "subcommittee_dict": subcommittee_dict}
+    return {"committee_id": None, "committee": None, "subcommittee_dict": None}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--committees", type=int, default=250)
+    parser.add_argument("--hearings", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.03)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    committees = make_committees(args.committees)
+    urls = [f"https://{rng.choice(['', 'www.'])}committee{rng.randrange(args.committees)}.house.gov/hearing/{n}"
+            for n in range(args.hearings)]
+
+    collection = FixtureCollection(committees, args.latency)
+    start = time.perf_counter()
+    expected = [scan_lookup(collection, url, args.latency) for url in urls]
+    scan = time.perf_counter() - start
+    print(f"scan:      {scan / len(urls) * 1000:8.3f}ms per hearing, {collection.queries} queries")
+
+    collection = FixtureCollection(committees, args.latency)
+    directory = CommitteeDirectory(collection)
+    start = time.perf_counter()
+    found = [directory.lookup(url) for url in urls]
+    indexed = time.perf_counter() - start
+    assert found == expected
+    print(f"directory: {indexed / len(urls) * 1000:8.3f}ms per hearing, {collection.queries} queries "
+          f"(including the first load), {scan / indexed:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
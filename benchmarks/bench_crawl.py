@@ -0,0 +1,80 @@
+"""Serial, async and staged crawl throughput against local stand-in county sites.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_crawl
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crawler import crawl_websites
+
+
+def make_handler(pages_per_host, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            links = "".join(
+                f'<a href="/page/{n}">Section {n}</a>' for n in range(pages_per_host)
+            )
+            body = f"<html><body><h1>{self.path}</h1>{links}</body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_hosts(count, pages_per_host, latency):
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(pages_per_host, latency))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def run(label, start_urls, **kwargs):
+    start = time.perf_counter()
+    _, visited = crawl_websites(start_urls, max_depth=1, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>6}: {len(visited)} pages in {elapsed:.2f}s ({len(visited) / elapsed:.1f} pages/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10)
+    parser.add_argument("--pages-per-host", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--delay", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    servers = start_hosts(args.hosts, args.pages_per_host, args.latency)
+    start_urls = [f"http://127.0.0.1:{s.server_address[1]}/" for s in servers]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            run("serial", start_urls, delay=args.delay)
+            run("async", start_urls, delay=args.delay, concurrency=args.concurrency)
+            run("staged", start_urls, delay=args.delay, concurrency=args.concurrency, staged=True)
+        finally:
+            os.chdir(cwd)
+
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
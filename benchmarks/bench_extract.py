@@ -0,0 +1,91 @@
+"""Link and text extraction: two BeautifulSoup trees vs one streaming pass.
+
+Uses saved pages under --corpus (e.g. crawled_pages/) when given, otherwise a
+generated set of municipal-code-like pages. Run from the repository root:
+
+    python -m benchmarks.bench_extract --corpus crawled_pages
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from extract import extract_links_and_text
+
+NAV = "".join(f'<li><a href="/government/departments/{n}">Department {n}</a></li>' for n in range(60))
+SCRIPT = "<script>window.dataLayer = window.dataLayer || [];" + "function gtag(){dataLayer.push(arguments);}" * 40 + "</script>"
+STYLE = "<style>" + ".nav-item{margin:0 4px;padding:2px}" * 60 + "</style>"
+
+
+def make_page(n, rng):
+    sections = "".join(
+        f'<h3 id="s{n}-{i}">Sec. {n}.{i:02d}. Short-term rental regulations.</h3>'
+        f'<p>A short-term rental shall not operate without a permit issued by the '
+        f'<a href="/code/title-{n}/ch-{i}">Department of Planning</a> &amp; Building. '
+        f'See <a href="/docs/ordinance-{rng.randrange(9999)}.pdf">Ordinance</a>.</p>'
+        for i in range(rng.randrange(20, 80))
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>Title {n}</title>{STYLE}{SCRIPT}</head>"
+        f"<body><nav><ul>{NAV}</ul></nav><main>{sections}</main>"
+        f"<footer><!-- footer --><p>&copy; County of Humboldt</p></footer></body></html>"
+    )
+
+
+def load_corpus(directory, count):
+    if directory:
+        pages = []
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(".html"):
+                    with open(os.path.join(root, file), "r", encoding="utf-8") as f:
+                        pages.append(f.read())
+        return pages
+    rng = random.Random(0)
+    return [make_page(n, rng) for n in range(count)]
+
+
+def two_trees(html):
+    # crawler.crawl_websites built one tree for links, process.py another for text
+    soup = BeautifulSoup(html, "html.parser")
+    links = [a.get("href") for a in soup.find_all("a") if a.get("href")]
+    text = BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
+    return links, text
+
+
+def measure(label, fn, pages):
+    start = time.perf_counter()
+    for html in pages:
+        fn(html)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for html in pages:
+        fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>10}: {len(pages) / elapsed:7.1f} pages/sec  peak traced allocations {peak / 2**20:6.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.pages)
+    size = sum(len(p) for p in pages)
+    print(f"{len(pages)} pages, {size / 2**20:.1f} MiB of HTML")
+
+    mismatches = sum(two_trees(html) != extract_links_and_text(html) for html in pages)
+    print(f"pages where links or text differ: {mismatches}")
+
+    measure("two trees", two_trees, pages)
+    measure("one pass", extract_links_and_text, pages)
+
+
+if __name__ == "__main__":
+    main()
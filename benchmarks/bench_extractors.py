@@ -0,0 +1,131 @@
+"""Check the per-site hearing extractors against saved pages, and against pages full of site chrome.
+
+Saved pages live under --fixtures (benchmarks/fixtures/hearings by default)
+as <netloc>/<name>.html next to <name>.json:
+
+    {"url": "...", "template": "senate_isvp", "committee_info": {...}, "expected": {"title": "...", ...}}
+
+with the expected fields checked by hand against the page. Each page is run
+through the site's registered extractor, or through `template` for a site
+not registered yet. A site should only be registered in extractors.EXTRACTORS
+once its pages come back with no wrong fields.
+
+The chrome check generates hearing pages whose header holds the committee's
+name in an <h1>, whose content region holds a "latest news" list with its
+own <time> and video link, and whose menu has a "Watch live" link, plus the
+same pages without a <main>. Every template must leave those values alone.
+Run from the repository root:
+
+    python -m benchmarks.bench_extractors --fixtures benchmarks/fixtures/hearings
+"""
+import argparse
+import glob
+import json
+import os
+import random
+
+from benchmarks.bench_minify import make_page
+from committees import normalize_netloc
+from extractors import EXTRACTORS, FIELDS, TEMPLATES, run_extractor
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "hearings")
+
+
+def load_fixtures(root):
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(root, "*", "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        with open(path[:-5] + ".html", "r", encoding="utf-8", errors="replace") as f:
+            fixture["html"] = f.read()
+        fixture["name"] = os.path.relpath(path[:-5], root)
+        fixtures.setdefault(normalize_netloc(fixture["url"]), []).append(fixture)
+    return fixtures
+
+
+def compare(fields, expected):
+    """(fields the extractor got wrong, expected fields it left to the LLM)."""
+    wrong = [field for field in FIELDS if field in fields and field in expected and fields[field] != expected[field]]
+    missed = [field for field in FIELDS if field in expected and field not in fields]
+    return wrong, missed
+
+
+def check_fixtures(root):
+    fixtures = load_fixtures(root)
+    unchecked = sorted(set(EXTRACTORS) - set(fixtures))
+    if unchecked:
+        print(f"registered without saved pages: {', '.join(unchecked)}")
+    if not fixtures:
+        print(f"no saved pages under {root}; every hearing goes to the LLM until some are saved and checked")
+        return
+    for netloc, pages in sorted(fixtures.items()):
+        wrong_pages = 0
+        filled = expected_count = 0
+        for fixture in pages:
+            extractor = EXTRACTORS.get(netloc) or TEMPLATES[fixture["template"]]
+            fields = run_extractor(extractor, fixture["html"], fixture["url"], fixture.get("committee_info", {}))
+            wrong, missed = compare(fields, fixture["expected"])
+            wrong_pages += bool(wrong)
+            expected_count += len(fixture["expected"])
+            filled += len(fixture["expected"]) - len(missed)
+            for field in wrong:
+                print(f"  {fixture['name']}: {field} = {fields[field]!r}, expected {fixture['expected'][field]!r}")
+        status = "registered" if netloc in EXTRACTORS else "not registered"
+        print(f"{netloc} ({status}): {len(pages)} pages, {wrong_pages} with a wrong field, "
+              f"{filled / expected_count if expected_count else 0:.0%} of fields filled without the LLM")
+
+
+def chrome_page(n, rng, with_main):
+    page = make_page(n, rng)
+    page = page.replace('<header class="site-header">',
+                        '<header class="site-header"><h1 class="site-name">Committee on Banking, Housing, and Urban '
+                        'Affairs</h1>')
+    page = page.replace('<ul class="menu">', '<ul class="menu"><li><a href="/watch-live">Watch live</a></li>')
+    page = page.replace('<h2>Witnesses</h2>',
+                        '<div class="latest-news"><h3>Latest news</h3><time datetime="2024-09-02T09:30:00-04:00">'
+                        'September 2, 2024 9:30 AM</time> <a href="https://www.youtube.com/watch?v=latest">Watch the '
+                        'latest video</a> Rayburn House Office Building 2128</div><h2>Witnesses</h2>')
+    if not with_main:
+        page = page.replace("<main>", "<div>").replace("</main>", "</div>")
+    truth = {
+        "title": f"Oversight of Federal Program {n}",
+        "date_time": f"07/{1 + n % 28:02d}/24 10:00AM",
+        "location": f"Dirksen Senate Office Building {500 + n % 100}",
+        "video_link": f"https://www.senate.gov/isvp/?type=arch&comm=banking&filename=banking{n}",
+    }
+    return page, truth
+
+
+def check_chrome(pages):
+    rng = random.Random(0)
+    committee_info = {"subcommittee_dict": {f"Program {s}": f"{s:02d}" for s in range(5)}}
+    for with_main in (True, False):
+        for name, template in TEMPLATES.items():
+            wrong = filled = 0
+            for n in range(pages):
+                page, truth = chrome_page(n, rng, with_main)
+                fields = run_extractor(template, page, f"https://committee.example.gov/hearings/{n}", committee_info)
+                if name == "senate_archive_stream" and "archive_stream" in page:
+                    truth["video_link"] = "url"
+                elif name in ("house_administration", "house_youtube"):
+                    truth.pop("video_link")  # these pages have no YouTube video of the hearing
+                    wrong += "video_link" in fields
+                bad, _ = compare(fields, truth)
+                wrong += len(bad)
+                filled += len([field for field in fields if field in truth])
+            region = "with <main>" if with_main else "without <main>"
+            print(f"chrome check, {name}, {region}: {wrong} wrong fields, {filled} filled over {pages} pages")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of saved hearing pages")
+    parser.add_argument("--pages", type=int, default=20, help="generated pages per template for the chrome check")
+    args = parser.parse_args()
+
+    check_fixtures(args.fixtures)
+    check_chrome(args.pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Frontier time and peak memory on a synthetic 100k-link municipal code graph.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_frontier
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from frontier import Frontier
+
+VARIANTS = [
+    "https://library.municode.com/ca/humboldt/codes/{n}",
+    "http://library.municode.com/ca/humboldt/codes/{n}/",
+    "https://www.library.municode.com/ca/humboldt/codes/{n}#section",
+    "https://library.municode.com/ca/humboldt/codes/{n}?utm_source=google&utm_medium=cpc",
+]
+
+
+def make_graph(pages, links_per_page, seed=0):
+    rng = random.Random(seed)
+    graph = {}
+    for n in range(pages):
+        graph[n] = [
+            rng.choice(VARIANTS).format(n=rng.randrange(pages))
+            for _ in range(links_per_page)
+        ]
+    return graph
+
+
+def page_id(url):
+    return int(url.split("/codes/")[1].split("/")[0].split("#")[0].split("?")[0])
+
+
+def crawl_list(graph, start):
+    # The original crawl_websites loop: list.pop(0), dedup only when popped
+    visited = set()
+    to_visit = [start]
+    while to_visit:
+        url = to_visit.pop(0)
+        if url in visited:
+            continue
+        visited.add(url)
+        to_visit.extend(graph[page_id(url)])
+    return len(visited)
+
+
+def crawl_frontier(graph, start, **kwargs):
+    frontier = Frontier(**kwargs)
+    frontier.push(start, 0)
+    visited = 0
+    while frontier:
+        url, depth = frontier.pop()
+        visited += 1
+        for link in graph[page_id(url)]:
+            frontier.push(link, depth + 1)
+    return visited
+
+
+def measure(label, fn, *args, **kwargs):
+    start = time.perf_counter()
+    visited = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    # Measured in a second run so tracing overhead does not skew the timing
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>16}: {visited:>7} fetches  {elapsed:7.2f}s  peak {peak / 2**20:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20000)
+    parser.add_argument("--links-per-page", type=int, default=5)
+    args = parser.parse_args()
+
+    graph = make_graph(args.pages, args.links_per_page)
+    start = VARIANTS[0].format(n=0)
+    print(f"{args.pages * args.links_per_page} links across {args.pages} pages")
+
+    measure("list + pop(0)", crawl_list, graph, start)
+    measure("frontier", crawl_frontier, graph, start)
+    measure("frontier + bloom", crawl_frontier, graph, start, bloom_capacity=args.pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Hearing scraping throughput and checkpoint I/O, against local stand-in committee pages.
+
+Serves --hearings pages from a local server, answers the extraction prompt
+from a fake OpenAI server, and runs HearingScraper.process_hearings at each
+--concurrency. Committee lookup is stubbed so MongoDB is not needed. Also
+reports how many bytes the old save (the whole JSON rewritten every 5
+hearings) would have written for the same output. Run from the repository root:
+
+    python -m benchmarks.bench_hearings --hearings 200 --concurrency 1 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+import llm
+from benchmarks.fake_openai import FakeOpenAI
+from llm import ResponseCache
+from skeleton import HearingScraper
+
+REPLY = json.dumps({
+    "title": "Oversight of the Department",
+    "video_link": "url",
+    "subcommittee": "Full Committee",
+    "subcommittee_id": "",
+    "location": "Dirksen Senate Office Building 538",
+    "witnesses": ["Mr. Michael Knisley, Executive Secretary-Treasurer"],
+    "date_time": "07/31/24 10:00AM",
+})
+
+
+def make_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = (f"<html><body><h1>Hearing {self.path}</h1>"
+                    f"<p>Witness testimony for {self.path}.</p></body></html>").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class StubCommitteeScraper(HearingScraper):
+    def get_committee(self, url):
+        return {"committee_id": "SSBK", "committee": "Banking", "subcommittee_dict": {}}
+
+
+def old_save_bytes(hearings):
+    # The previous process_hearings rewrote everything so far every 5 hearings and at the end
+    return sum(len(json.dumps(hearings[:n], indent=2).encode("utf-8"))
+               for n in range(1, len(hearings) + 1) if n % 5 == 0 or n == len(hearings))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hearings", type=int, default=100)
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("skeleton").setLevel(logging.WARNING)
+
+    pages = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.page_latency))
+    threading.Thread(target=pages.serve_forever, daemon=True).start()
+    server = FakeOpenAI(latency=args.llm_latency, reply=lambda request: REPLY)
+    llm.set_client(OpenAI(base_url=server.base_url, api_key="local-benchmark"))
+
+    hearings = [{"title": f"Hearing {n}", "url": f"http://127.0.0.1:{pages.server_address[1]}/hearing/{n}"}
+                for n in range(args.hearings)]
+
+    with tempfile.TemporaryDirectory() as root:
+        for concurrency in args.concurrency:
+            input_file = os.path.join(root, f"hearings-{concurrency}.json")
+            with open(input_file, "w") as f:
+                json.dump(hearings, f)
+            # A fresh cache per run so every hearing reaches the server
+            scraper = StubCommitteeScraper(llm_cache=ResponseCache(os.path.join(root, f"cache-{concurrency}.sqlite")))
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = scraper.process_hearings(input_file, input_file, concurrency=concurrency)
+            with open(input_file) as f:
+                output = json.load(f)
+            assert all(hearing["scraped"] for hearing in output)
+            print(f"concurrency {concurrency:>3}: {stats['hearings_per_minute']:7.1f} hearings/minute "
+                  f"({stats['seconds']:.1f}s), {stats['checkpoint_bytes']} checkpoint bytes "
+                  f"vs {old_save_bytes(output)} bytes of full rewrites")
+
+    server.shutdown()
+    pages.shutdown()
+
+
+if __name__ == "__main__":
+    main()
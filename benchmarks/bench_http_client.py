@@ -0,0 +1,74 @@
+"""Connections opened and throughput for a 500-page same-host crawl.
+
+Compares bare `requests.get` (a new connection per request) with the shared
+pooled session in http_client. Run from the repository root:
+
+    python -m benchmarks.bench_http_client
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import http_client
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = f"<html><body><h1>{self.path}</h1>{'x' * 2000}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(label, server, urls, get):
+    server.connections = 0
+    start = time.perf_counter()
+    for url in urls:
+        get(url).raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>14}: {len(urls)} pages, {server.connections:>3} connections, "
+          f"{elapsed:.2f}s ({len(urls) / elapsed:.0f} pages/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    server = CountingServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/code/section-{n}" for n in range(args.pages)]
+
+    run("requests.get", server, urls, requests.get)
+    run("http_client", server, urls, http_client.get)
+    http_client.metrics.report()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
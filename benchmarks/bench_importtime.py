@@ -0,0 +1,90 @@
+"""Import cost of the pipeline's entry modules, measured with `python -X importtime`.
+
+Each module is imported in a fresh interpreter, from an empty working
+directory, with placeholder credentials in the environment. Reports the
+cumulative import time of the module, the interpreter's wall time, and any
+files the import left behind. --ref also measures an older revision
+(checked out into a temporary git worktree) for comparison; imports that
+fail or run past --timeout are reported as such. Run from the repository root:
+
+    python -m benchmarks.bench_importtime --ref HEAD~1
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODULES = ("browse", "process", "skeleton", "pipeline")
+
+# Placeholders so that revisions which read credentials at import get past that point
+ENVIRONMENT = {
+    "OPENAI_API_KEY": "import-benchmark",
+    "MONGO_DB_NAME": "import-benchmark",
+    "MONGO_DB_USER": "import-benchmark",
+    "RESCRIPT_CLUSTER_PASS": "import-benchmark",
+    "VALUESERP_API_KEY": "import-benchmark",
+}
+
+
+def cumulative_us(stderr, module):
+    # Lines look like "import time:       412 |      10234 | process"; nested imports are indented
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module and not parts[2][1:].startswith(" "):
+            return int(parts[1])
+    return None
+
+
+def measure(source, module, timeout):
+    with tempfile.TemporaryDirectory() as cwd:
+        env = {**os.environ, **ENVIRONMENT, "PYTHONPATH": source, "PYTHONDONTWRITEBYTECODE": "1"}
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                                       env=env, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"status": f"timed out after {timeout}s", "wall": time.perf_counter() - start,
+                    "cumulative": None, "files": sorted(os.listdir(cwd))}
+        wall = time.perf_counter() - start
+        status = "ok"
+        if completed.returncode:
+            errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+            status = "failed: " + (errors[-1] if errors else f"exit {completed.returncode}")
+        return {"status": status, "wall": wall, "cumulative": cumulative_us(completed.stderr, module),
+                "files": sorted(os.listdir(cwd))}
+
+
+def report(label, source, timeout, repeat):
+    print(f"{label}:")
+    for module in MODULES:
+        # Median of `repeat` runs; a single import is noisy
+        runs = sorted((measure(source, module, timeout) for _ in range(repeat)), key=lambda run: run["wall"])
+        result = runs[len(runs) // 2]
+        cumulative = f"{result['cumulative'] / 1000:8.1f}ms" if result["cumulative"] is not None else "       n/a"
+        files = f", created {', '.join(result['files'])}" if result["files"] else ""
+        print(f"  {module:10s} import {cumulative}  wall {result['wall']:6.2f}s  {result['status']}{files}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ref", help="also measure this git revision, e.g. HEAD~1")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before an import is abandoned")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if args.ref:
+        with tempfile.TemporaryDirectory() as worktree:
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, args.ref], cwd=root, check=True,
+                           capture_output=True)
+            try:
+                report(args.ref, worktree, args.timeout, args.repeat)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=root, capture_output=True)
+    report("working tree", root, args.timeout, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Prompt tokens per hearing page before and after minify.minify_html.
+
+"Before" is what the scraper used to send: the page with <polygon> and
+<path> tags removed. Pass --pages with a directory of saved committee
+hearing pages (*.html); otherwise pages shaped like Senate committee
+hearing pages are generated.
+
+Regression check: every field the extraction prompt asks for must survive
+minification. That covers iframe and video URLs (including those only in a
+script nested in an empty wrapper), headings, dates and times, and the text
+of witness blocks. With --llm (needs OPENAI_API_KEY; answers
+are cached in .llm_cache.sqlite) the extraction also runs on both versions
+of each page and the fields are compared. Run from the repository root:
+
+    python -m benchmarks.bench_minify --pages saved_hearings/ --llm
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from minify import VIDEO_URL, fit_token_budget, minify_html
+from skeleton import HearingScraper
+from tokens import count_tokens
+
+DATE = re.compile(r'\b(?:\d{1,2}/\d{1,2}/\d{2,4}|(?:January|February|March|April|May|June|July|August|September|'
+                  r'October|November|December) \d{1,2}, \d{4}|\d{1,2}:\d{2} ?[AaPp]\.?[Mm]\.?)')
+FIELDS = ("title", "video_link", "subcommittee", "location", "witnesses", "date_time")
+
+
+def make_page(n, rng):
+    menu = "".join(f'<li class="menu-item menu-item-{i}"><a class="nav-link" data-track="nav-{i}" '
+                   f'href="/about/section-{i}">Section {i}</a></li>' for i in range(rng.randrange(60, 120)))
+    icons = "".join(f'<svg class="icon" viewBox="0 0 24 24"><path d="M{i} 2L{i + 3} 21 2 9h20z"/>'
+                    f'<polygon points="0,0 {i},4 8,8"/></svg>' for i in range(20))
+    witnesses = "".join(f'<div class="witness-block row"><div class="col-md-8"><span class="witness-name">'
+                        f'The Honorable Witness {n}-{w}</span><br/><span class="witness-title">Director, '
+                        f'Agency {w}</span></div><a class="btn btn-sm" href="/download/testimony-{n}-{w}.pdf">'
+                        f'Testimony</a></div>' for w in range(rng.randrange(2, 6)))
+    archive = (f"<script>var archive_stream = 'https://www.senate.gov/isvp/?type=arch&comm=hsgac&filename=hsgac{n}';"
+               f"</script>" if n % 4 == 0 else "")
+    # Some pages set the stream from a script inside an otherwise empty player wrapper
+    player = f'<div class="player-wrap">{archive}</div>' if n % 8 == 4 else ""
+    if player:
+        archive = ""
+    footer = "".join(f'<a class="footer-link" href="/footer/{i}">Footer link {i}</a>' for i in range(60))
+    return f"""<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width"><title>Hearing {n} | Committee</title>
+<link rel="stylesheet" href="/themes/committee/css/main.css?v={n}">
+<style>.menu-item{{display:inline-block;padding:4px}} .witness-block{{margin:8px}} {"body{color:#333} " * 40}</style>
+<script>(function(w,d,s,l,i){{w[l]=w[l]||[];w[l].push({{'gtm.start':new Date().getTime()}});}})(window,document,
+'script','dataLayer','GTM-{n}');{"var tracker = analytics.init('UA-1234'); " * 30}</script>
+{archive}</head><body class="page-hearing node-{n}">
+<!-- Google Tag Manager (noscript) --><noscript><iframe src="https://www.googletagmanager.com/ns.html"></iframe></noscript>
+<header class="site-header"><div class="container"><nav class="navbar"><ul class="menu">{menu}</ul></nav>{icons}</div></header>
+<main><div class="container"><div class="row"><div class="col-md-12">
+<h1 class="hearing-title">Oversight of Federal Program {n}</h1>
+<div class="hearing-date">July {1 + n % 28}, 2024 10:00 AM</div>
+<div class="hearing-location">Dirksen Senate Office Building {500 + n % 100}</div>
+<div class="subcommittee">Subcommittee on Program {n % 5}</div>{player}
+<div class="video-wrapper embed-responsive"><iframe allowfullscreen class="embed-responsive-item"
+ src="https://www.senate.gov/isvp/?type=arch&comm=banking&filename=banking{n}" width="320" height="240"></iframe></div>
+<h2>Witnesses</h2>{witnesses}
+<div class="share-tools">{icons}</div></div></div></div></main>
+<footer class="site-footer"><div class="container">{footer}<form action="/subscribe"><input name="email"><button>Subscribe</button></form></div></footer>
+</body></html>"""
+
+
+def expected_fields(page):
+    """What the prompt must still be able to see after minification."""
+    soup = BeautifulSoup(page, "html.parser")
+    expected = {frame["src"] for frame in soup.find_all("iframe") if frame.get("src")
+                and not frame.find_parent("noscript")}
+    expected.update(VIDEO_URL.findall(page))
+    expected.update(heading.get_text(" ", strip=True) for heading in soup.find_all(["h1", "h2", "h3"]))
+    expected.update(DATE.findall(soup.get_text(" ")))
+    for block in soup.find_all(class_=re.compile("witness")):
+        expected.update(block.stripped_strings)
+    return {value for value in expected if value and "googletagmanager" not in value}
+
+
+def present(value, minified):
+    soup = BeautifulSoup(minified, "html.parser")
+    text = " ".join(soup.get_text(" ").split())
+    attributes = " ".join(str(attribute) for tag in soup.find_all(True) for attribute in tag.attrs.values())
+    return value in minified or value in attributes or " ".join(value.split()) in text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", help="directory of saved hearing pages (*.html)")
+    parser.add_argument("--generate", type=int, default=50, help="pages to generate when --pages is not given")
+    parser.add_argument("--max-tokens", type=int, default=30000)
+    parser.add_argument("--llm", action="store_true", help="also compare extracted fields with the real model")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages[os.path.basename(path)] = f.read()
+    else:
+        rng = random.Random(0)
+        pages = {f"generated-{n}": make_page(n, rng) for n in range(args.generate)}
+
+    scraper = HearingScraper(minify=False, max_html_tokens=None)
+    before_tokens = after_tokens = 0
+    seconds = 0.0
+    lost = {}
+    minified_pages = {}
+    for name, page in pages.items():
+        before = scraper.prepare_html(page)
+        start = time.perf_counter()
+        after = fit_token_budget(minify_html(page), args.max_tokens)
+        seconds += time.perf_counter() - start
+        before_tokens += count_tokens(before)
+        after_tokens += count_tokens(after)
+        minified_pages[name] = (before, after)
+        missing = [value for value in expected_fields(page) if not present(value, after)]
+        if missing:
+            lost[name] = missing
+
+    print(f"{len(pages)} pages: {before_tokens / len(pages):.0f} -> {after_tokens / len(pages):.0f} prompt tokens "
+          f"per page ({1 - after_tokens / before_tokens:.1%} fewer), {seconds / len(pages) * 1000:.1f}ms to minify")
+    print(f"regression check: {len(pages) - len(lost)}/{len(pages)} pages keep every expected field")
+    for name, missing in lost.items():
+        print(f"  {name}: lost {missing[:5]}")
+
+    if args.llm:
+        committee_info = {"subcommittee_dict": {"Full Committee": ""}}
+        changed = 0
+        for name, (before, after) in minified_pages.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                original = scraper.get_consolidated_llm_response(before, committee_info)
+                reduced = scraper.get_consolidated_llm_response(after, committee_info)
+            differences = [field for field in FIELDS if original.get(field) != reduced.get(field)]
+            if differences:
+                changed += 1
+                print(f"  {name}: {', '.join(differences)} differ")
+        print(f"LLM check: {len(pages) - changed}/{len(pages)} pages extract the same fields")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Near-duplicate clustering: LSH candidates vs comparing every pair of signatures.
+
+Generates --documents distinct pages plus printer-friendly and lightly
+edited copies of some of them, then checks the clusters against the known
+copies. Run from the repository root:
+
+    python -m benchmarks.bench_neardup --documents 5000
+"""
+import argparse
+import random
+import time
+
+from neardup import MinHasher, cluster_near_duplicates, similarity
+
+WORDS = ("permit", "shall", "county", "parcel", "zoning", "operator", "within", "days", "fee", "hearing",
+         "department", "applicant", "structure", "violation", "notice", "approval", "district", "use",
+         "rental", "dwelling", "occupancy", "setback", "grading", "cultivation", "signage", "appeal")
+
+
+def make_corpus(count, copies, rng):
+    texts = {}
+    truth = []
+    for n in range(count):
+        texts[f"page-{n}"] = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(300, 3000)))
+    for n in rng.sample(range(count), copies):
+        original = texts[f"page-{n}"].split()
+        edited = original[:]
+        start = rng.randrange(len(edited) - 10)
+        edited[start:start + 10] = ["amended"] * 10
+        texts[f"page-{n}-print"] = "Print this page " + " ".join(original) + " Copyright County of Humboldt"
+        texts[f"page-{n}-pdf"] = " ".join(edited)
+        truth.append({f"page-{n}", f"page-{n}-print", f"page-{n}-pdf"})
+    return texts, truth
+
+
+def all_pairs(signatures, threshold):
+    # The quadratic alternative LSH avoids; returns the number of similar pairs
+    found = 0
+    for i in range(len(signatures)):
+        for j in range(i + 1, len(signatures)):
+            found += similarity(signatures[i][1], signatures[j][1]) >= threshold
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--skip-all-pairs", action="store_true")
+    args = parser.parse_args()
+
+    texts, truth = make_corpus(args.documents, args.copies, random.Random(0))
+    print(f"{len(texts)} documents, {len(truth)} groups of copies")
+
+    hasher = MinHasher()
+    start = time.perf_counter()
+    signatures = [(key, hasher.signature(text)) for key, text in texts.items()]
+    print(f"signatures: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    clusters = cluster_near_duplicates(signatures, args.threshold)
+    print(f"LSH clustering: {time.perf_counter() - start:.3f}s, {len(clusters)} clusters, "
+          f"{sum(set(cluster) in truth for cluster in clusters)} match the known copies exactly")
+
+    if not args.skip_all_pairs:
+        start = time.perf_counter()
+        pairs = all_pairs(signatures, args.threshold)
+        print(f"all pairs: {time.perf_counter() - start:.2f}s, {pairs} similar pairs "
+              f"(expected {3 * len(truth)})")
+
+
+if __name__ == "__main__":
+    main()
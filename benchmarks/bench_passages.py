@@ -0,0 +1,91 @@
+"""Tokens sent per document: full-document chunks vs relevance-ranked passages.
+
+Generates municipal codes of several sizes, some with a short-term rental
+section buried at a random position and some without. A local fake OpenAI
+server answers True only when the prompt contains that section, so the
+full-document path keeps sending 100k-token chunks until it reaches it (or
+the end). Expect a few minutes: those chunks also wait on process.rate_limiter's
+default 300k tokens-per-minute budget. Run from the repository root:
+
+    python -m benchmarks.bench_passages --budget 4000
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import re
+
+from openai import OpenAI
+
+import llm
+import process
+from benchmarks.fake_openai import FakeOpenAI
+from tokens import TokenizedText
+
+TOPICS = ("Animal control", "Solid waste collection", "Road encroachment permits", "Building setbacks",
+          "Grading and erosion control", "Cannabis cultivation", "Noise limits", "Signs and billboards")
+WORDS = ("permit", "shall", "county", "parcel", "zoning", "operator", "within", "days", "fee", "hearing",
+         "department", "applicant", "structure", "violation", "notice", "approval", "district", "use")
+STR_SECTION = ("## Sec. 314-55.4. Short-term rentals\n"
+               "A. No person shall operate a short-term rental in Humboldt County without a permit.\n"
+               "B. Short-term rentals are limited to 90 nights per calendar year in the R-1 zone.\n\n")
+RELEVANT = re.compile(r"short-term rental", re.IGNORECASE)
+
+
+def make_code(tokens, relevant, rng):
+    parts = []
+    size = 0
+    n = 0
+    while size < tokens * 4:  # ~4 characters per token
+        section = (f"## Sec. 314-{n // 40}.{n % 40:02d}. {rng.choice(TOPICS)}\n"
+                   + "".join(" ".join(rng.choice(WORDS) for _ in range(rng.randrange(20, 60))) + ".\n"
+                             for _ in range(rng.randrange(3, 9))) + "\n")
+        parts.append(section)
+        size += len(section)
+        n += 1
+    if relevant:
+        parts.insert(rng.randrange(len(parts)), STR_SECTION)
+    return "".join(parts)
+
+
+def judge(request):
+    return "True" if RELEVANT.search(request["messages"][-1]["content"]) else "False"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000, 150000, 400000])
+    parser.add_argument("--budget", type=int, default=4000)
+    args = parser.parse_args()
+    logging.getLogger("process").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    server = FakeOpenAI(latency=0, reply=judge)
+    llm.set_client(OpenAI(base_url=server.base_url, api_key="local-benchmark"))
+    process.llm_cache = None
+    rng = random.Random(0)
+
+    print(f"{'doc tokens':>10}  {'relevant':>8}  {'full path':>9}  {'passages':>8}  {'answers':>13}")
+    totals = [0, 0]
+    for size in args.sizes:
+        for relevant in (True, False):
+            tokenized = TokenizedText(make_code(size, relevant, rng))
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = len(server.requests)
+                full_answer = process.call_llm_api(tokenized.text, "short term rental", "Humboldt County", "CA",
+                                                   tokenized=tokenized)
+                full_sent = sum(process.count_tokens(r["messages"][-1]["content"]) for r in server.requests[start:])
+                start = len(server.requests)
+                passage_answer, _ = process.call_llm_api_passages(tokenized, "short term rental", "Humboldt County",
+                                                                  "CA", budget=args.budget)
+                passage_sent = sum(process.count_tokens(r["messages"][-1]["content"]) for r in server.requests[start:])
+            totals[0] += full_sent
+            totals[1] += passage_sent
+            print(f"{len(tokenized):10d}  {str(relevant):>8}  {full_sent:9d}  {passage_sent:8d}  "
+                  f"{str(full_answer):>5} / {str(passage_answer):<5}")
+    print(f"total prompt tokens: full path {totals[0]}, passages {totals[1]} ({totals[1] / totals[0]:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Wall time and peak RSS of PDF-to-markdown conversion, before and after streaming.
+
+Generates a multi-hundred-page PDF, then converts it in a fresh interpreter
+per mode so peak RSS is not shared between runs. Run from the repository root:
+
+    python -m benchmarks.bench_pdf --pages 600
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from crawler import convert_pdf_to_markdown
+
+SECTION = (
+    "Sec. {n}. Short-term rental permits. No person shall operate a short-term "
+    "rental within the unincorporated area of the County without a valid permit "
+    "issued under this chapter. "
+)
+
+
+def make_pdf(path, pages):
+    # A noisy "scanned exhibit" per page makes the file as heavy as real codes
+    document = fitz.open()
+    for n in range(pages):
+        page = document.new_page()
+        text = (SECTION.format(n=n) * 12).strip()
+        page.insert_textbox(fitz.Rect(54, 54, 558, 500), text, fontsize=9)
+        noise = fitz.Pixmap(fitz.csRGB, 256, 256, os.urandom(256 * 256 * 3), False)
+        page.insert_image(fitz.Rect(54, 520, 310, 776), pixmap=noise)
+    document.save(path)
+
+
+def convert_before(pdf_path, md_path):
+    # Original crawler.save_pdf_as_markdown: whole body in memory, += per page
+    with open(pdf_path, 'rb') as f:
+        content = f.read()
+    pdf_document = fitz.open(stream=content, filetype="pdf")
+    md_content = ""
+    for page_num in range(len(pdf_document)):
+        page = pdf_document.load_page(page_num)
+        md_content += page.get_text("markdown")
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write(md_content)
+
+
+def peak_rss_mib():
+    # VmHWM resets on exec, unlike ru_maxrss which a child inherits from its parent
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, pdf_path, md_path):
+    start = time.perf_counter()
+    if mode == "before":
+        convert_before(pdf_path, md_path)
+    else:
+        convert_pdf_to_markdown(pdf_path, md_path)
+    elapsed = time.perf_counter() - start
+    self_rss = peak_rss_mib()
+    line = f"{mode:>6}: {elapsed:6.2f}s  peak RSS {self_rss:6.1f} MiB"
+    if mode == "after":
+        worker_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        line += f" (largest worker {worker_rss:.1f} MiB, {os.cpu_count()} CPUs)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=600)
+    parser.add_argument("--mode", choices=["before", "after"])
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    if args.mode:
+        with tempfile.TemporaryDirectory() as workdir:
+            run_mode(args.mode, args.pdf, os.path.join(workdir, "out.md"))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = os.path.join(workdir, "code.pdf")
+        make_pdf(pdf_path, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(pdf_path) / 2**20:.1f} MiB")
+        for mode in ("before", "after"):
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_pdf", "--mode", mode, "--pdf", pdf_path],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Writing scraped hearings to MongoDB: one request per document vs sink.MongoHearingSink's batched upserts.
+
+Runs against a local mongod with --uri (20000 hearings by default),
+otherwise against mongomock if it is installed (300 by default: mongomock
+scans the whole collection for every upsert). mongomock has no network
+round trips, so only a real mongod shows the full cost of per-document
+requests. The benchmark database is dropped afterwards. Run from the
+repository root:
+
+    python -m benchmarks.bench_sink --uri mongodb://localhost:27017
+"""
+import argparse
+import sys
+import time
+
+from sink import MongoHearingSink
+
+DATABASE = "hearing_sink_benchmark"
+
+
+def make_hearing(n):
+    return {
+        "url": f"https://www.banking.senate.gov/hearings/{n}",
+        "title": f"Oversight of Federal Program {n}",
+        "video_link": f"https://www.senate.gov/isvp/?type=arch&comm=banking&filename=banking{n}",
+        "committee_id": "SSBK",
+        "committee": "Banking, Housing, and Urban Affairs",
+        "subcommittee": "",
+        "subcommittee_id": "",
+        "thomas_id": "SSBK",
+        "location": f"Dirksen Senate Office Building {500 + n % 100}",
+        "witnesses": [f"The Honorable Witness {n}-{w}, Director, Agency {w}" for w in range(4)],
+        "date_time": "2024-07-31 14:00:00+00:00",
+        "scraped": True,
+    }
+
+
+def timed(label, hearings, write):
+    start = time.perf_counter()
+    write()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>32}: {len(hearings) / elapsed:9.0f} documents/sec ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", help="a local mongod, e.g. mongodb://localhost:27017")
+    parser.add_argument("--hearings", type=int, help="default 20000 against mongod, 300 against mongomock")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.uri)
+        hearing_count = args.hearings or 20000
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("Pass --uri for a local mongod, or pip install mongomock")
+        client = mongomock.MongoClient()
+        hearing_count = args.hearings or 300
+    client.drop_database(DATABASE)
+    db = client[DATABASE]
+    hearings = [make_hearing(n) for n in range(hearing_count)]
+
+    try:
+        def insert_each():
+            for hearing in hearings:
+                db["per-document"].insert_one(dict(hearing))
+
+        def upsert_each():
+            db["per-document-upsert"].create_index("url", unique=True)
+            for hearing in hearings:
+                db["per-document-upsert"].update_one({"url": hearing["url"]}, {"$set": hearing}, upsert=True)
+
+        def sink_all(sink):
+            for index, hearing in enumerate(hearings):
+                sink.add(index, hearing)
+            sink.flush()
+
+        timed("insert_one per hearing", hearings, insert_each)
+        timed("update_one upsert per hearing", hearings, upsert_each)
+        sink = MongoHearingSink(db, job="benchmark", batch_size=args.batch_size)
+        timed(f"sink, batches of {args.batch_size}", hearings, lambda: sink_all(sink))
+        assert db["committee-meetings"].count_documents({}) == len(hearings)
+        assert sink.stored_offset() == len(hearings)
+        # A rerun upserts the same URLs: nothing is duplicated
+        sink = MongoHearingSink(db, job="benchmark-rerun", batch_size=args.batch_size)
+        timed("sink again, same hearings", hearings, lambda: sink_all(sink))
+        assert db["committee-meetings"].count_documents({}) == len(hearings)
+    finally:
+        client.drop_database(DATABASE)
+
+
+if __name__ == "__main__":
+    main()
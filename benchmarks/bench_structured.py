@@ -0,0 +1,123 @@
+"""LLM reply parsing: the old regex cleanup + json.loads vs structured.parse_fields.
+
+Parses a corpus of extraction replies both ways. Pass --responses with a
+JSONL file of recorded replies, one {"content": "..."} per line. Otherwise
+a corpus shaped like gpt-4o-mini's replies is generated. Most of those
+replies are clean JSON. The rest have entities, nulls, a date in the wrong
+format, witnesses as one string, or a fenced non-JSON reply. Reports
+replies parsed per second, how many replies would need the repair call,
+and how many the old path turned into a dict that crashes extract_data.
+Run from the repository root:
+
+    python -m benchmarks.bench_structured --responses recorded_replies.jsonl
+"""
+import argparse
+import contextlib
+import html
+import io
+import json
+import random
+import re
+import time
+
+from structured import HearingFields, parse_fields
+
+
+def clean_llm_response_dict(text):
+    # skeleton.py's cleanup before structured outputs, kept here for comparison
+    text = text.strip()
+    code_block_pattern = r'^```[\w\s]*\n|```$'
+    text = re.sub(code_block_pattern, '', text, flags=re.MULTILINE)
+    text = text.replace('`', '')
+    language_specifiers = ['plaintext', 'json', 'python', 'html', 'javascript']
+    for specifier in language_specifiers:
+        if text.lower().startswith(specifier + '\n'):
+            text = text[len(specifier)+1:]
+    text = text.strip()
+    text = re.sub(r'^[\'"]|[\'"]$', '', text)
+    text = text.replace('\n', '')
+
+    start_index = text.find('{')
+    end_index = text.rfind('}')
+
+    if start_index != -1 and end_index != -1 and start_index < end_index:
+        text = text[start_index:end_index+1]
+    else:
+        return ""
+
+    print()
+    print(text)
+    text = text.replace('\\"', '\\\\"')
+    print()
+    print(text)
+    print()
+    return text
+
+
+def old_parse(content):
+    try:
+        string_response = clean_llm_response_dict(content)
+        string_response = html.unescape(string_response).encode('utf-8').decode('unicode-escape')
+        return json.loads(string_response)
+    except json.JSONDecodeError:
+        return {}
+
+
+def make_reply(n, rng):
+    fields = {
+        "title": f"Oversight of Federal Program {n}",
+        "video_link": f"https://www.senate.gov/isvp/?type=arch&comm=banking&filename=banking{n}",
+        "subcommittee": rng.choice(["Full Committee", "Economic Policy", "Housing, Transportation, and Community Development"]),
+        "subcommittee_id": "",
+        "location": f"Dirksen Senate Office Building {500 + n % 100}",
+        "witnesses": [f"The Honorable Witness {n}-{w}, Director, Agency {w}" for w in range(rng.randrange(1, 6))],
+        "date_time": f"07/{1 + n % 28:02d}/24 10:00AM",
+    }
+    roll = rng.random()
+    if roll < 0.05:
+        fields["title"] = f"Reauthorizing the Workforce &amp; Jobs Act of {2000 + n % 24}"
+    elif roll < 0.08:
+        fields["location"] = None
+    elif roll < 0.10:
+        fields["date_time"] = f"July {1 + n % 28}, 2024 10:00 AM"
+    elif roll < 0.11:
+        fields["witnesses"] = "; ".join(fields["witnesses"])
+    elif roll < 0.12:
+        return "```json\n" + repr(fields) + "\n```"
+    return json.dumps(fields, indent=2 if rng.random() < 0.5 else None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--responses", help="JSONL of recorded replies with a 'content' key")
+    parser.add_argument("--generate", type=int, default=20000, help="replies to generate when --responses is not given")
+    args = parser.parse_args()
+
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            replies = [json.loads(line)["content"] for line in f if line.strip()]
+    else:
+        rng = random.Random(0)
+        replies = [make_reply(n, rng) for n in range(args.generate)]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        old = [old_parse(reply) for reply in replies]
+    old_seconds = time.perf_counter() - start
+    crashes = sum("subcommittee" not in data for data in old)
+
+    start = time.perf_counter()
+    new = [parse_fields(HearingFields, reply) for reply in replies]
+    new_seconds = time.perf_counter() - start
+    repairs = sum(bool(invalid) for _, invalid, _ in new)
+    whole = sum("__all__" in invalid for _, invalid, _ in new)
+
+    print(f"{len(replies)} replies")
+    print(f"old cleanup:   {len(replies) / old_seconds:9.0f} replies/sec, {crashes} parsed to a dict without "
+          f"'subcommittee' (extract_data raises KeyError)")
+    print(f"parse_fields:  {len(replies) / new_seconds:9.0f} replies/sec, {repairs} ({repairs / len(replies):.1%}) "
+          f"need a repair call, {whole} of them for the whole reply")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Token accounting: per-call encoders and repeated encodes vs tokens.py.
+
+Runs the classification-side accounting (count, then chunk) and pipeline's
+line-by-line chunking over one large markdown municipal code, counting
+tiktoken encode calls. Pass --file to use a real converted PDF, otherwise a
+generated code is used. Run from the repository root:
+
+    python -m benchmarks.bench_tokens --file crawled_pages/blobs/ab/abcd...
+"""
+import argparse
+import random
+import time
+
+import tiktoken
+
+import tokens
+
+ENCODE_METHODS = ("encode", "encode_ordinary", "encode_batch", "encode_ordinary_batch")
+
+
+class EncodeCounter:
+    """Counts top-level calls to tiktoken.Encoding's encode methods while active.
+
+    encode_batch's own per-item encodes count as part of the one batch call.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.depth = 0
+        self.originals = {}
+
+    def __enter__(self):
+        for name in ENCODE_METHODS:
+            original = getattr(tiktoken.Encoding, name)
+            self.originals[name] = original
+
+            def counted(*args, _original=original, **kwargs):
+                if not self.depth:
+                    self.calls += 1
+                self.depth += 1
+                try:
+                    return _original(*args, **kwargs)
+                finally:
+                    self.depth -= 1
+
+            setattr(tiktoken.Encoding, name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self.originals.items():
+            setattr(tiktoken.Encoding, name, original)
+
+
+def make_code(sections, rng):
+    words = ("permit", "dwelling", "unit", "operator", "shall", "occupancy", "parcel", "zoning",
+             "transient", "rental", "county", "ordinance", "hosting", "platform", "within", "days")
+    parts = []
+    for n in range(sections):
+        parts.append(f"## Sec. 314-{n // 40}.{n % 40:02d}. Short-term rental regulations\n")
+        for _ in range(rng.randrange(3, 9)):
+            parts.append(f"{rng.randrange(1, 12)}. " + " ".join(rng.choice(words) for _ in range(rng.randrange(20, 60))) + ".\n")
+        parts.append("| Zone | Max nights | Fee |\n|---|---|---|\n| R-1 | 90 | $250 |\n\n")
+    return "".join(parts)
+
+
+# What process.py and pipeline.py did before tokens.py
+def old_count_tokens(text):
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return len(encoding.encode(text))
+
+
+def old_chunk_content(content, max_tokens):
+    encoding = tiktoken.encoding_for_model("gpt-4")
+    encoded = encoding.encode(content)
+    return [encoding.decode(encoded[i:i + max_tokens]) for i in range(0, len(encoded), max_tokens)]
+
+
+def old_line_counts(content):
+    return [old_count_tokens(line) for line in content.split("\n")]
+
+
+def before(text, max_tokens):
+    count = old_count_tokens(text)
+    chunks = old_chunk_content(text, max_tokens)
+    return count, chunks, old_line_counts(text)
+
+
+def after(text, max_tokens):
+    tokenized = tokens.TokenizedText(text)
+    return len(tokenized), tokenized.chunks(max_tokens), tokens.count_lines(text.split("\n"))
+
+
+def measure(label, fn, text, max_tokens):
+    with EncodeCounter() as counter:
+        start = time.perf_counter()
+        result = fn(text, max_tokens)
+        elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {elapsed:6.2f}s  {counter.calls:7d} encode calls")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--sections", type=int, default=4000)
+    parser.add_argument("--max-tokens", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = make_code(args.sections, random.Random(0))
+    tokens.get_encoding()  # loading the BPE ranks is a one-off cost for both
+    print(f"{len(text) / 2**20:.1f} MiB of markdown, {text.count(chr(10)) + 1} lines")
+
+    old = measure("before", before, text, args.max_tokens)
+    new = measure("after", after, text, args.max_tokens)
+    print(f"{old[0]} tokens, {len(old[1])} chunks; same counts and chunks: {old == new}")
+
+
+if __name__ == "__main__":
+    main()
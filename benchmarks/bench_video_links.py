@@ -0,0 +1,132 @@
+"""Video link resolution: a full GET per hearing vs HEAD, memoized, across concurrent hearings.
+
+A local server stands in for video player pages: each link redirects
+twice before reaching a --player-bytes page, and several hearings share
+a video. HearingScraper.validate_and_set_defaults runs for every hearing.
+The old resolver downloaded the player page each time, one hearing after
+another. Reports bytes of response bodies sent per hearing, requests, and
+wall time. --no-head makes the server refuse HEAD so the streamed GET
+fallback is measured. Run from the repository root:
+
+    python -m benchmarks.bench_video_links --hearings 200 --videos 120
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_client
+from skeleton import HearingScraper
+
+COMMITTEE_INFO = {"committee_id": "SSBK", "committee": "Banking", "subcommittee_dict": {}}
+
+
+class PlayerServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, player_bytes, latency, allow_head):
+        self.player_bytes = player_bytes
+        self.latency = latency
+        self.allow_head = allow_head
+        self.lock = threading.Lock()
+        self.body_bytes = 0
+        self.requests = 0
+        super().__init__(("127.0.0.1", 0), PlayerHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def handle_error(self, request, client_address):
+        pass  # clients that stop reading after the headers reset the connection
+
+    def count(self, body_bytes):
+        with self.lock:
+            self.requests += 1
+            self.body_bytes += body_bytes
+
+
+class PlayerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def respond(self, send_body):
+        time.sleep(self.server.latency)
+        kind, _, video = self.path.strip("/").partition("/")
+        if kind in ("v", "r"):
+            self.send_response(302)
+            self.send_header("Location", f"/{'r' if kind == 'v' else 'player'}/{video}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            self.server.count(0)
+            return
+        body = b"<html>" + b"<script>player()</script>" * (self.server.player_bytes // 25) + b"</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading after the headers
+        self.server.count(len(body) if send_body else 0)
+
+    def do_GET(self):
+        self.respond(True)
+
+    def do_HEAD(self):
+        if not self.server.allow_head:
+            self.send_response(405)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            self.server.count(0)
+            return
+        self.respond(False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OldResolver(HearingScraper):
+    def get_final_url(self, url):
+        return http_client.get(url, allow_redirects=True).url
+
+
+def run(label, scraper, server, links, concurrency):
+    before_bytes, before_requests = server.body_bytes, server.requests
+    start = time.perf_counter()
+
+    def validate(n):
+        data = {"video_link": links[n], "committee_id": "SSBK", "subcommittee_id": ""}
+        return scraper.validate_and_set_defaults(data, COMMITTEE_INFO, f"https://banking.senate.gov/hearings/{n}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(validate, range(len(links))))
+    elapsed = time.perf_counter() - start
+    assert all("/player/" in result["video_link"] for result in results)
+    print(f"{label:>28}: {(server.body_bytes - before_bytes) / len(links) / 1024:8.1f} KiB per hearing, "
+          f"{server.requests - before_requests:5d} requests, {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hearings", type=int, default=200)
+    parser.add_argument("--videos", type=int, default=120, help="distinct video links among the hearings")
+    parser.add_argument("--player-bytes", type=int, default=300_000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-head", action="store_true", help="server answers HEAD with 405")
+    args = parser.parse_args()
+
+    server = PlayerServer(args.player_bytes, args.latency, allow_head=not args.no_head)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    rng = random.Random(0)
+    links = [f"{base}/v/{rng.randrange(args.videos)}" for _ in range(args.hearings)]
+
+    run("GET per hearing, serial", OldResolver(), server, links, 1)
+    run("resolver, serial", HearingScraper(), server, links, 1)
+    run(f"resolver, {args.concurrency} hearings at once", HearingScraper(), server, links, args.concurrency)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
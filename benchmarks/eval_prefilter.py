@@ -0,0 +1,116 @@
+"""Recall and LLM calls saved by the BM25 prefilter, across thresholds.
+
+Labels come from one of:
+  --labels FILE.jsonl   lines of {"text": ... or "path": ..., "label": 0 or 1}
+  --csv FILE --store DIR  a previous run's business_impact_assessment.csv,
+                          treating the LLM's answers as ground truth
+otherwise a generated corpus of ordinance pages and crawl noise is used.
+Run from the repository root:
+
+    python -m benchmarks.eval_prefilter --csv business_impact_assessment.csv --store crawled_pages
+"""
+import argparse
+import csv
+import json
+import random
+
+from prefilter import Prefilter
+
+THRESHOLDS = (0.0, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0)
+
+FILLER = ("The Board of Supervisors meets on the first and third Tuesday of each month. "
+          "Agendas are posted 72 hours in advance. Public comment is limited to three minutes per speaker. ")
+RELEVANT = [
+    "Sec. 314-55.4. Short-term rentals. No person shall operate a short-term rental in {place} without a permit.",
+    "Vacation dwelling unit rentals of fewer than 30 consecutive nights require a business license in {place}.",
+    "The transient occupancy tax applies to short term rental stays in the unincorporated area of {place}.",
+    "Ordinance No. 2710 amending the zoning regulations for home sharing and short-term rental of dwellings.",
+    "Hosting platforms shall remove listings for short-term rentals lacking a valid permit number.",
+    "Transient rental of a residence for 30 days or less is a regulated use; the operator must obtain a zoning clearance.",
+]
+IRRELEVANT = [
+    "Contact the Department of Health and Human Services at 707-445-6200. Office hours are 8am to 5pm.",
+    "Road closures: Highway 36 will be reduced to one lane near Bridgeville for culvert replacement.",
+    "Apply for jobs with {place}. Current openings include Deputy Sheriff and Library Assistant.",
+    "The animal shelter is open for adoptions Tuesday through Saturday. Dogs must be licensed.",
+    "Cannabis cultivation permits are processed by the Planning and Building Department of {place}.",
+    "Property tax bills are mailed in October. The first installment is due November 1.",
+    "Sign up for emergency alerts about wildfire, tsunami and flood warnings in {place}.",
+]
+
+
+def generated_corpus(count, place, rng):
+    corpus = []
+    for n in range(count):
+        label = int(rng.random() < 0.3)
+        sentences = rng.sample(RELEVANT if label else IRRELEVANT, 2)
+        if not label and rng.random() < 0.3:
+            # Navigation text that mentions rentals without regulating them
+            sentences.append("Quick links: Housing, Rental Assistance, Permits, Ordinances.")
+        body = " ".join(s.format(place=place) for s in sentences)
+        corpus.append((FILLER * rng.randrange(1, 20) + body, label))
+    return corpus
+
+
+def labeled_jsonl(path):
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            item = json.loads(line)
+            if "text" in item:
+                text = item["text"]
+            else:
+                with open(item["path"], "r", encoding="utf-8") as doc:
+                    text = doc.read()
+            corpus.append((text, int(item["label"])))
+    return corpus
+
+
+def labeled_by_previous_run(csv_path, store_dir):
+    from store import ContentStore
+    store = ContentStore(store_dir)
+    corpus = []
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            # Rows the prefilter rejected were never labeled by the model
+            if row.get("sent_to_llm", "1") == "0":
+                continue
+            corpus.append((store.read_text(row["content_hash"]), int(row["impacts_business"])))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels")
+    parser.add_argument("--csv")
+    parser.add_argument("--store", default="crawled_pages")
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--issue", default="short term rental")
+    parser.add_argument("--city-county", default="Humboldt County")
+    parser.add_argument("--state", default="CA")
+    args = parser.parse_args()
+
+    if args.labels:
+        corpus = labeled_jsonl(args.labels)
+    elif args.csv:
+        corpus = labeled_by_previous_run(args.csv, args.store)
+    else:
+        corpus = generated_corpus(args.documents, args.city_county, random.Random(0))
+
+    positives = sum(label for _, label in corpus)
+    print(f"{len(corpus)} documents, {positives} relevant")
+
+    prefilter = Prefilter(args.issue, args.city_county, args.state).fit(text for text, _ in corpus)
+
+    print(f"{'threshold':>9}  {'recall':>6}  {'calls saved':>11}  {'missed':>6}")
+    for threshold in THRESHOLDS:
+        prefilter.threshold = threshold
+        kept = [(prefilter.keep(text)[0], label) for text, label in corpus]
+        recalled = sum(keep and label for keep, label in kept)
+        sent = sum(keep for keep, _ in kept)
+        recall = recalled / positives if positives else 1.0
+        print(f"{threshold:9.1f}  {recall:6.1%}  {1 - sent / len(kept):11.1%}  {positives - recalled:6d}")
+
+
+if __name__ == "__main__":
+    main()
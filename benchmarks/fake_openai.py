@@ -0,0 +1,91 @@
+"""A local stand-in for the OpenAI chat completions endpoint, used by the benchmarks."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.2, requests_per_minute=None, reply=None):
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.reply = reply or (lambda request: "True")
+        self.lock = threading.Lock()
+        self.available = float(requests_per_minute or 0)
+        self.updated = time.monotonic()
+        self.completions = 0
+        self.rate_limited = 0
+        self.requests = []
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def admit(self):
+        """Returns (allowed, remaining, seconds until the next request is allowed).
+
+        Like OpenAI, the request budget refills continuously up to the limit.
+        """
+        if not self.requests_per_minute:
+            return True, 10000, 0.0
+        with self.lock:
+            now = time.monotonic()
+            rate = self.requests_per_minute / 60
+            self.available = min(self.requests_per_minute, self.available + (now - self.updated) * rate)
+            self.updated = now
+            if self.available < 1:
+                self.rate_limited += 1
+                return False, 0, (1 - self.available) / rate
+            self.available -= 1
+            return True, int(self.available), max(0.0, (1 - self.available) / rate)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        allowed, remaining, reset = self.server.admit()
+        limit = self.server.requests_per_minute or 10000
+        headers = {
+            "x-ratelimit-limit-requests": str(limit),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+        if not allowed:
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                           {**headers, "Retry-After": f"{reset:.3f}"})
+            return
+
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.completions += 1
+            self.server.requests.append(request)
+        content = self.server.reply(request)
+        self.send_json(200, {
+            "id": "chatcmpl-local",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 1, "total_tokens": 1},
+        }, headers)
+
+    def send_json(self, status, payload, headers):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,74 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+URL_KEYS = ("url", "minority_url")
+NOT_FOUND = {"committee_id": None, "committee": None, "subcommittee_dict": None}
+
+def normalize_netloc(url):
+    netloc = urlparse(url).netloc
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return netloc
+
+class CommitteeDirectory:
+    """Committees indexed by the normalized host of their `url` and `minority_url`.
+
+    The collection is read once and re-read after `ttl` seconds, so looking
+    up a hearing's committee is a dict lookup rather than a scan of the
+    collection. If a refresh fails the previous index keeps being used.
+    """
+
+    def __init__(self, collection, ttl=3600):
+        self.collection = collection
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.index = None
+        self.loaded_at = 0.0
+
+    def load(self):
+        index = {}
+        projection = {"_id": 0, "thomas_id": 1, "name": 1, "subcommittees": 1, "url": 1, "minority_url": 1}
+        for committee in self.collection.find({}, projection):
+            subcommittee_dict = {
+                subcommittee["name"]: subcommittee["thomas_id"]
+                for subcommittee in committee.get("subcommittees", [])
+            }
+            subcommittee_dict["Full Committee"] = ""
+            entry = {
+                "committee_id": committee["thomas_id"],
+                "committee": committee["name"],
+                "subcommittee_dict": subcommittee_dict,
+            }
+            netlocs = {normalize_netloc(committee[key]) for key in URL_KEYS if committee.get(key)}
+            for netloc in netlocs:
+                # Keep collection order so the first matching committee wins, as with a scan
+                index.setdefault(netloc, []).append(entry)
+        return index
+
+    def entries(self):
+        if self.index is None or time.time() - self.loaded_at >= self.ttl:
+            with self.lock:
+                if self.index is None or time.time() - self.loaded_at >= self.ttl:
+                    try:
+                        self.index = self.load()
+                        logger.info(f"Loaded {sum(map(len, self.index.values()))} committee URLs")
+                    except Exception as e:
+                        if self.index is None:
+                            raise
+                        logger.error(f"Error refreshing committees, keeping the previous list: {e}")
+                    self.loaded_at = time.time()
+        return self.index
+
+    def lookup(self, url):
+        """The committee whose site hosts `url`, as committee_id, committee and subcommittee_dict."""
+        candidates = self.entries().get(normalize_netloc(url), [])
+        if "cha.house.gov" in url:
+            candidates = [entry for entry in candidates if entry["committee_id"] == "HSHA"]
+        if not candidates:
+            return dict(NOT_FOUND)
+        entry = candidates[0]
+        return {**entry, "subcommittee_dict": dict(entry["subcommittee_dict"])}
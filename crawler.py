@@ -1,101 +1,512 @@
 import requests
-from bs4 import BeautifulSoup
+import httpx
+import asyncio
 from urllib.parse import urljoin, urlparse
 import os
 import time
 import fitz  # PyMuPDF
 import io
+import tempfile
+import threading
+import queue
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import http_client
+from frontier import Frontier
+from extract import extract_links_and_text
+from store import ContentStore, file_sha256
+
+MAX_PDF_BYTES = 200 * 1024 * 1024
+PDF_PAGES_PER_TASK = 25
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+_store = None
+_store_lock = threading.Lock()
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least `delay` seconds apart.
+
+    Each call reserves the next free slot for the URL's host, so requests to
+    unrelated hosts never wait on each other.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def reserve(self, url):
+        """Claim the host's next slot and return how many seconds to wait for it."""
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.delay
+        return slot - now
+
+    async def wait(self, url):
+        seconds = self.reserve(url)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    def wait_sync(self, url):
+        seconds = self.reserve(url)
+        if seconds > 0:
+            time.sleep(seconds)
+
+def fetch(url, cache=None, delay=0):
+    if cache:
+        meta, fresh = cache.lookup(url)
+        if fresh:
+            return cache.serve(url, meta)
+    time.sleep(delay)
+    if cache:
+        return cache.get(url)
+    return http_client.get(url)
+
+def crawl_websites(start_urls, max_depth=0, delay=1, concurrency=None, bloom_capacity=None, cache=None,
+                   staged=False, store=None, limiter=None):
+    """Crawl from `start_urls`; returns (pdf_links, visited_urls).
+
+    Pass a shared HostRateLimiter as `limiter` to keep per-host politeness
+    across several crawls running at once (staged and async modes).
+    """
+    if staged:
+        crawler = StagedCrawler(max_depth, delay, fetch_workers=concurrency or 8,
+                                bloom_capacity=bloom_capacity, cache=cache, store=store, limiter=limiter)
+        return crawler.run(start_urls)
+    if concurrency:
+        return asyncio.run(crawl_websites_async(start_urls, max_depth, delay, concurrency, bloom_capacity, cache, store,
+                                                limiter))
 
-def crawl_websites(start_urls, max_depth=0, delay=1):
     visited_urls = set()
     pdf_links = set()
-    to_visit = [(url, 0) for url in start_urls]
+    frontier = Frontier(bloom_capacity=bloom_capacity)
+    for url in start_urls:
+        frontier.push(url, 0)
 
-    while to_visit:
-        current_url, depth = to_visit.pop(0)
-        
-        if current_url in visited_urls or depth > max_depth:
-            continue
-        
+    while frontier:
+        current_url, depth = frontier.pop()
         visited_urls.add(current_url)
         
         try:
-            # Add delay before each request
-            time.sleep(delay)
-            
-            response = requests.get(current_url)
-            
             if current_url.lower().endswith('.pdf'):
-                save_pdf_as_markdown(current_url, response.content)
-                pdf_links.add(current_url)
+                time.sleep(delay)
+                if download_pdf_as_markdown(current_url, cache, store):
+                    pdf_links.add(current_url)
             else:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                # Delay before each request that actually goes to the network
+                response = fetch(current_url, cache, delay)
+                links, text = extract_links_and_text(response.text)
                 
                 # Save page source
-                save_page_source(current_url, response.text)
+                save_page_source(current_url, response.text, text, store)
                 
-                # Find links
-                for link in soup.find_all('a'):
-                    href = link.get('href')
-                    if href:
-                        full_url = urljoin(current_url, href)
-                        if full_url.lower().endswith('.pdf'):
-                            # Download PDF immediately
-                            try:
-                                pdf_response = requests.get(full_url)
-                                save_pdf_as_markdown(full_url, pdf_response.content)
+                # Follow links
+                for href in links:
+                    full_url = urljoin(current_url, href)
+                    if full_url.lower().endswith('.pdf'):
+                        if not frontier.mark(full_url):
+                            continue
+                        # Download PDF immediately
+                        try:
+                            if download_pdf_as_markdown(full_url, cache, store):
                                 pdf_links.add(full_url)
                                 print(f"Downloaded and saved PDF: {full_url}")
-                            except requests.RequestException as e:
-                                print(f"Error downloading PDF {full_url}: {e}")
-                        elif depth < max_depth:
-                            to_visit.append((full_url, depth + 1))
+                        except requests.RequestException as e:
+                            print(f"Error downloading PDF {full_url}: {e}")
+                    elif depth < max_depth:
+                        frontier.push(full_url, depth + 1)
         
         except requests.RequestException as e:
             print(f"Error crawling {current_url}: {e}")
-    
+
+    http_client.metrics.report()
+    if cache:
+        cache.report()
     return list(pdf_links), list(visited_urls)
 
-def save_page_source(url, content):
-    parsed_url = urlparse(url)
-    domain = parsed_url.netloc
-    path = parsed_url.path.strip('/')
-    
-    if not path:
-        path = 'index'
-    
-    directory = os.path.join('crawled_pages', domain, os.path.dirname(path))
-    os.makedirs(directory, exist_ok=True)
-    
-    filename = os.path.join(directory, f"{os.path.basename(path)}.html")
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(content)
-    print(f"Saved HTML: {filename}")
-
-def save_pdf_as_markdown(url, content):
-    parsed_url = urlparse(url)
-    domain = parsed_url.netloc
-    path = parsed_url.path.strip('/')
-    
-    directory = os.path.join('crawled_pages', domain, os.path.dirname(path))
-    os.makedirs(directory, exist_ok=True)
-    
-    filename = os.path.join(directory, f"{os.path.basename(path)}.md")
-    
+async def crawl_websites_async(start_urls, max_depth=0, delay=1, concurrency=10, bloom_capacity=None, cache=None,
+                               store=None, limiter=None):
+    visited_urls = set()
+    pdf_links = set()
+    frontier = Frontier(bloom_capacity=bloom_capacity)
+    limiter = limiter or HostRateLimiter(delay)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with http_client.async_client() as client:
+        async def fetch(url):
+            if cache:
+                meta, fresh = cache.lookup(url)
+                if fresh:
+                    return cache.serve(url, meta)
+            await limiter.wait(url)
+            async with semaphore:
+                if cache:
+                    return await cache.aget(url, client)
+                return await http_client.aget(client, url)
+
+        async def visit_pdf(url):
+            # PDFs are streamed to disk by the blocking client on a worker thread
+            await limiter.wait(url)
+            try:
+                async with semaphore:
+                    saved = await asyncio.to_thread(download_pdf_as_markdown, url, cache, store)
+                if saved:
+                    pdf_links.add(url)
+                    print(f"Downloaded and saved PDF: {url}")
+            except requests.RequestException as e:
+                print(f"Error downloading PDF {url}: {e}")
+            return []
+
+        async def visit_page(url, depth):
+            if url.lower().endswith('.pdf'):
+                return await visit_pdf(url)
+
+            try:
+                response = await fetch(url)
+            except httpx.HTTPError as e:
+                print(f"Error crawling {url}: {e}")
+                return []
+
+            links, text = extract_links_and_text(response.text)
+            save_page_source(url, response.text, text, store)
+
+            found = []
+            for href in links:
+                full_url = urljoin(url, href)
+                if full_url.lower().endswith('.pdf'):
+                    found.append((full_url, None))
+                elif depth < max_depth:
+                    found.append((full_url, depth + 1))
+            return found
+
+        tasks = set()
+        for url in start_urls:
+            if frontier.mark(url):
+                visited_urls.add(url)
+                tasks.add(asyncio.create_task(visit_page(url, 0)))
+
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for url, depth in task.result():
+                    if not frontier.mark(url):
+                        continue
+                    if depth is None:
+                        # Linked PDFs are downloaded regardless of depth
+                        tasks.add(asyncio.create_task(visit_pdf(url)))
+                    else:
+                        visited_urls.add(url)
+                        tasks.add(asyncio.create_task(visit_page(url, depth)))
+
+    http_client.metrics.report()
+    if cache:
+        cache.report()
+    return list(pdf_links), list(visited_urls)
+
+class StageStats:
+    def __init__(self, name, workers, work_queue):
+        self.name = name
+        self.workers = workers
+        self.queue = work_queue
+        self.processed = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.processed += 1
+            self.busy += seconds
+
+class StagedCrawler:
+    """Crawl with fetch, parse, persist and PDF stages joined by bounded queues.
+
+    Fetching runs on `fetch_workers` I/O threads, HTML parsing on
+    `parse_workers` threads, page writes on one thread, and PDF download and
+    conversion on `pdf_workers` threads (conversion fans out to the PDF process
+    pool). A full queue blocks the stage feeding it, so each stage holds at most
+    `queue_size` pages. Discovered links go into the frontier instead of
+    straight into the fetch queue, so fetch and parse can never block on each
+    other.
+    """
+
+    def __init__(self, max_depth=0, delay=1, fetch_workers=8, parse_workers=2, pdf_workers=2,
+                 queue_size=32, bloom_capacity=None, cache=None, store=None, report_interval=10, limiter=None):
+        self.max_depth = max_depth
+        self.cache = cache
+        self.store = store
+        self.report_interval = report_interval
+        self.limiter = limiter or HostRateLimiter(delay)
+        self.frontier = Frontier(bloom_capacity=bloom_capacity)
+        # Guards the frontier and the count of URLs still being worked on
+        self.frontier_ready = threading.Condition()
+        self.pending = 0
+        self.done = threading.Event()
+
+        self.visited_urls = set()
+        self.pdf_links = set()
+        self.results_lock = threading.Lock()
+
+        self.stages = [
+            StageStats('fetch', fetch_workers, queue.Queue(queue_size)),
+            StageStats('parse', parse_workers, queue.Queue(queue_size)),
+            StageStats('persist', 1, queue.Queue(queue_size)),
+            StageStats('pdf', pdf_workers, queue.Queue(queue_size)),
+        ]
+        self.fetch_stage, self.parse_stage, self.persist_stage, self.pdf_stage = self.stages
+
+    def _finish(self):
+        with self.frontier_ready:
+            self.pending -= 1
+            if self.pending == 0:
+                self.done.set()
+                self.frontier_ready.notify_all()
+
+    def _push_page(self, url, depth):
+        with self.frontier_ready:
+            if self.frontier.push(url, depth):
+                self.pending += 1
+                self.frontier_ready.notify()
+
+    def _push_pdf(self, url):
+        with self.frontier_ready:
+            if not self.frontier.mark(url):
+                return
+            self.pending += 1
+        self.pdf_stage.queue.put(url)
+
+    def _feed(self):
+        while True:
+            with self.frontier_ready:
+                while not self.frontier and not self.done.is_set():
+                    self.frontier_ready.wait()
+                if self.done.is_set():
+                    return
+                item = self.frontier.pop()
+            self.fetch_stage.queue.put(item)
+
+    def _worker(self, stage, handle):
+        # A handler returns True once it has passed the URL on to the next stage;
+        # otherwise the URL is finished here, whether the handler succeeded or raised
+        while True:
+            item = stage.queue.get()
+            if item is None:
+                return
+            start = time.perf_counter()
+            handed_off = False
+            try:
+                handed_off = handle(item)
+            except Exception as e:
+                url = item if isinstance(item, str) else item[0]
+                print(f"Error in {stage.name} stage for {url}: {e}")
+            finally:
+                stage.record(time.perf_counter() - start)
+                if not handed_off:
+                    self._finish()
+
+    def _fetch(self, item):
+        url, depth = item
+        try:
+            if url.lower().endswith('.pdf'):
+                with self.results_lock:
+                    self.visited_urls.add(url)
+                self.pdf_stage.queue.put(url)
+                return True
+            if not (self.cache and self.cache.lookup(url)[1]):
+                self.limiter.wait_sync(url)
+            response = fetch(url, self.cache)
+            with self.results_lock:
+                self.visited_urls.add(url)
+            html = response.text
+        except requests.RequestException as e:
+            print(f"Error crawling {url}: {e}")
+            return
+        self.parse_stage.queue.put((url, depth, html))
+        return True
+
+    def _parse(self, item):
+        url, depth, html = item
+        text = None
+        try:
+            links, text = extract_links_and_text(html)
+            for href in links:
+                full_url = urljoin(url, href)
+                if full_url.lower().endswith('.pdf'):
+                    self._push_pdf(full_url)
+                elif depth < self.max_depth:
+                    self._push_page(full_url, depth + 1)
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
+        self.persist_stage.queue.put((url, html, text))
+        return True
+
+    def _persist(self, item):
+        url, html, text = item
+        try:
+            save_page_source(url, html, text, self.store)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error saving {url}: {e}")
+
+    def _convert_pdf(self, url):
+        try:
+            if not (self.cache and self.cache.lookup(url)[1]):
+                self.limiter.wait_sync(url)
+            if download_pdf_as_markdown(url, self.cache, self.store):
+                with self.results_lock:
+                    self.pdf_links.add(url)
+                print(f"Downloaded and saved PDF: {url}")
+        except requests.RequestException as e:
+            print(f"Error downloading PDF {url}: {e}")
+
+    def stats(self):
+        """Per-stage queue depth, items processed, throughput and worker utilisation."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return [{
+            'stage': stage.name,
+            'queue_depth': stage.queue.qsize(),
+            'queue_size': stage.queue.maxsize,
+            'processed': stage.processed,
+            'per_second': stage.processed / elapsed,
+            'utilisation': stage.busy / (elapsed * stage.workers),
+        } for stage in self.stages]
+
+    def report(self):
+        for s in self.stats():
+            print(f"  {s['stage']:>7}: queue {s['queue_depth']:>3}/{s['queue_size']}, "
+                  f"{s['processed']} done, {s['per_second']:.1f}/s, {s['utilisation']:.0%} busy")
+
+    def run(self, start_urls):
+        self.started = time.perf_counter()
+        handlers = {'fetch': self._fetch, 'parse': self._parse, 'persist': self._persist, 'pdf': self._convert_pdf}
+        threads = [threading.Thread(target=self._feed, daemon=True)]
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=self._worker, args=(stage, handlers[stage.name]), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        # Count seeding as work so the crawl cannot look finished halfway through it
+        with self.frontier_ready:
+            self.pending += 1
+        for url in start_urls:
+            self._push_page(url, 0)
+        self._finish()
+
+        while not self.done.wait(self.report_interval):
+            print("Crawl progress:")
+            self.report()
+
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.queue.put(None)
+        for thread in threads:
+            thread.join()
+
+        print("Crawl stages:")
+        self.report()
+        http_client.metrics.report()
+        if self.cache:
+            self.cache.report()
+        return list(self.pdf_links), list(self.visited_urls)
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ContentStore('crawled_pages')
+    return _store
+
+def save_page_source(url, content, text=None, store=None):
+    digest = (store or get_store()).save_page(url, content, text)
+    print(f"Saved HTML: {url} ({digest[:12]})")
+
+def get_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                _pdf_pool = ProcessPoolExecutor()
+    return _pdf_pool
+
+def convert_page_range(pdf_path, start, end):
+    with fitz.open(pdf_path) as pdf_document:
+        return "".join(pdf_document.load_page(n).get_text("markdown") for n in range(start, end))
+
+def convert_pdf_to_markdown(pdf_path, md_path, pages_per_task=PDF_PAGES_PER_TASK):
+    """Convert a PDF on disk page range by page range, appending to `md_path` in page order."""
+    with fitz.open(pdf_path) as pdf_document:
+        page_count = len(pdf_document)
+
+    starts = list(range(0, page_count, pages_per_task))
+    ends = [min(start + pages_per_task, page_count) for start in starts]
+    if len(starts) > 1:
+        parts = get_pdf_pool().map(convert_page_range, repeat(pdf_path), starts, ends)
+    else:
+        parts = map(convert_page_range, repeat(pdf_path), starts, ends)
+
+    with open(md_path, 'w', encoding='utf-8') as f:
+        for part in parts:
+            f.write(part)
+
+def save_converted_pdf(url, pdf_path, store=None):
+    store = store or get_store()
+    # A PDF already converted (under this URL or another) is not converted again
+    source_hash = file_sha256(pdf_path)
+    converted = store.converted_from(source_hash)
+    if converted:
+        digest = converted['content_hash']
+        store.record(url, digest, 'text/markdown', digest, converted['size'], source_hash)
+        print(f"Unchanged PDF, reusing markdown: {url} ({digest[:12]})")
+        return
+
+    fd, md_path = tempfile.mkstemp(suffix='.md')
+    os.close(fd)
     try:
-        pdf_document = fitz.open(stream=content, filetype="pdf")
-        md_content = ""
-        
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)
-            md_content += page.get_text("markdown")
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(md_content)
-        
-        print(f"Saved markdown for PDF: {filename}")
+        convert_pdf_to_markdown(pdf_path, md_path)
+        digest = store.save_markdown_file(url, md_path, source_hash)
+    finally:
+        os.remove(md_path)
+    print(f"Saved markdown for PDF: {url} ({digest[:12]})")
+
+def download_pdf_as_markdown(url, cache=None, store=None):
+    """Stream a PDF to disk and convert it; returns False if it could not be converted."""
+    tmp_path = None
+    try:
+        if cache:
+            pdf_path = cache.get_to_file(url, max_bytes=MAX_PDF_BYTES)
+        else:
+            fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+            os.close(fd)
+            with http_client.get(url, stream=True) as response:
+                response.raise_for_status()
+                http_client.stream_to_file(response, tmp_path, MAX_PDF_BYTES)
+            pdf_path = tmp_path
+
+        save_converted_pdf(url, pdf_path, store)
+        return True
+    except requests.RequestException:
+        raise
+    except Exception as e:
+        print(f"Error converting PDF to markdown for {url}: {e}")
+        return False
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+def save_pdf_as_markdown(url, content, store=None):
+    fd, tmp_path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        save_converted_pdf(url, tmp_path, store)
     except Exception as e:
         print(f"Error converting PDF to markdown for {url}: {e}")
+    finally:
+        os.remove(tmp_path)
 
 def main():
     start_urls = [
@@ -0,0 +1,81 @@
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+# Text inside these never shows up in BeautifulSoup's get_text() either
+INVISIBLE_TAGS = {'script', 'style', 'template'}
+# Site chrome that every page of a site repeats: menus, tables of contents, headers and footers
+CHROME_TAGS = ('nav', 'header', 'footer', 'aside', 'form', 'noscript', 'script', 'style', 'template')
+CHROME_CLASS = re.compile(r'(?:^|[\s_-])(?:nav|navbar|navigation|menu|toc|sidebar|breadcrumbs?|footer|masthead|'
+                          r'skip-link)(?:$|[\s_-])', re.I)
+
+class LinkTextExtractor(HTMLParser):
+    """Collects <a href> values and visible text in one pass, without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.strings = []
+        self.hidden_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in INVISIBLE_TAGS:
+            self.hidden_depth += 1
+        elif tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+    def handle_endtag(self, tag):
+        if tag in INVISIBLE_TAGS and self.hidden_depth:
+            self.hidden_depth -= 1
+
+    def handle_data(self, data):
+        if not self.hidden_depth:
+            data = data.strip()
+            if data:
+                self.strings.append(data)
+
+    def unknown_decl(self, data):
+        if data.startswith('CDATA[') and not self.hidden_depth:
+            self.handle_data(data[6:])
+
+def extract_with_soup(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    links = [link.get('href') for link in soup.find_all('a') if link.get('href')]
+    return links, soup.get_text(separator=' ', strip=True)
+
+def extract_links_and_text(content):
+    """Return (hrefs, visible text) for an HTML page.
+
+    The text matches BeautifulSoup(content, 'html.parser').get_text(separator=' ', strip=True).
+    Falls back to BeautifulSoup if the streaming parser cannot handle the page.
+    """
+    try:
+        parser = LinkTextExtractor()
+        parser.feed(content)
+        parser.close()
+        return parser.links, ' '.join(parser.strings)
+    except Exception:
+        return extract_with_soup(content)
+
+def main_text(content):
+    """Visible text of a page's own content, without the site chrome around it.
+
+    Pages of a Municode or American Legal site share thousands of words of
+    menus and tables of contents; comparing them whole makes unrelated
+    sections look like copies of each other.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    for tag in soup.find_all(CHROME_TAGS):
+        if not tag.decomposed:
+            tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.name in ('html', 'body', 'main', 'article'):
+            continue
+        names = ' '.join(tag.get('class') or []) + ' ' + (tag.get('id') or '') + ' ' + (tag.get('role') or '')
+        if CHROME_CLASS.search(names):
+            tag.decompose()
+    region = soup.find('main') or soup.find(attrs={'role': 'main'}) or soup.find('article') or soup.body or soup
+    return region.get_text(separator=' ', strip=True)
@@ -0,0 +1,257 @@
+import re
+import threading
+from datetime import datetime
+from urllib.parse import urljoin
+
+import pytz
+from bs4 import BeautifulSoup
+
+from committees import normalize_netloc
+
+# The fields get_consolidated_llm_response returns; extractors fill what they can
+FIELDS = ('title', 'video_link', 'subcommittee', 'location', 'witnesses', 'date_time')
+
+DATE = re.compile(r'(January|February|March|April|May|June|July|August|September|October|November|December)'
+                  r'\.? (\d{1,2}),? (\d{4})|(\d{1,2})/(\d{1,2})/(\d{2,4})')
+TIME = re.compile(r'(\d{1,2}):(\d{2}) ?([AaPp])\.? ?[Mm]\.?')
+ROOM = re.compile(r'(?:(?:Dirksen|Hart|Russell|Rayburn|Longworth|Cannon|Ford)(?: Senate| House)? Office Building'
+                  r'|U\.?S\.? Capitol|Capitol Visitor Center)[,\s]*(?:Room )?[A-Z]{0,3}-?\d+[A-Z]?'
+                  r'|(?:SD|SH|SR|SVC|HVC|S)-\d+[A-Z]?')
+EASTERN = pytz.timezone('US/Eastern')
+ARCHIVE_STREAM = re.compile(r'\barchive_stream\b')
+FULL_COMMITTEE = re.compile(r'\bFull Committee\b|\bExecutive Session\b', re.I)
+YOUTUBE = re.compile(r'youtube\.com/(?:embed|watch|live)|youtu\.be/', re.I)
+# Parts of the content region that are not about the hearing on the page
+OFF_CONTENT_TAGS = {'nav', 'aside', 'footer', 'form'}
+OFF_CONTENT_CLASS = re.compile(r'(?:^|[\s_-])(?:nav|navbar|menu|toc|sidebar|breadcrumbs?|footer|masthead|banner|'
+                               r'related|latest|recent|news|upcoming|widget|promo|share|social)(?:$|[\s_-])', re.I)
+# Link text next to a witness name that is not part of it
+WITNESS_LINKS = {'testimony', 'download testimony', 'download', 'statement', 'pdf', 'video', 'biography', 'bio',
+                 'truth in testimony'}
+
+# netloc -> extractor. A site belongs here only once its saved pages, under
+# benchmarks/fixtures/hearings/<netloc>/, pass bench_extractors; every other
+# page goes to the LLM. None have been saved yet.
+EXTRACTORS = {}
+
+def register(*netlocs):
+    """Use the decorated function for pages on `netlocs` (as normalize_netloc returns them)."""
+    def decorator(extractor):
+        for netloc in netlocs:
+            EXTRACTORS[netloc] = extractor
+        return extractor
+    return decorator
+
+def extract_fields(html_content, url, committee_info):
+    """Fields parsed without the LLM for pages on a registered site, or None for other sites.
+
+    The result holds only the fields that were found.
+    """
+    extractor = EXTRACTORS.get(normalize_netloc(url))
+    if extractor is None:
+        return None
+    return run_extractor(extractor, html_content, url, committee_info)
+
+def run_extractor(extractor, html_content, url, committee_info):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    fields = extractor(soup, html_content, url)
+    subcommittee = find_subcommittee(soup, committee_info)
+    if subcommittee is not None:
+        fields.setdefault('subcommittee', subcommittee)
+    return {key: value for key, value in fields.items() if value}
+
+def missing_fields(fields):
+    return [field for field in FIELDS if not (fields or {}).get(field)]
+
+# Shared parsers for the site templates below. Each looks only inside the
+# page's content region and outside the menus, sidebars and news lists in it,
+# and gives up (None) rather than pick between several candidates.
+
+def content(soup):
+    """The page's main content region, or None when the page does not mark one.
+
+    Site headers and footers hold the committee's name, every subcommittee and
+    the latest news, so a page without one is left to the LLM.
+    """
+    return (soup.find('main') or soup.find(attrs={'role': 'main'})
+            or soup.find(id=re.compile(r'^(?:main|content)$|^main-content$', re.I)))
+
+def off_content(tag, region):
+    """Whether `tag` sits in a menu, sidebar, news list or the like inside `region`."""
+    for parent in (tag, *tag.parents):
+        if parent is region:
+            return False
+        if parent.name in OFF_CONTENT_TAGS:
+            return True
+        names = ' '.join(parent.get('class') or []) + ' ' + (parent.get('id') or '')
+        if OFF_CONTENT_CLASS.search(names):
+            return True
+    return False
+
+def content_tags(soup, *args, **kwargs):
+    region = content(soup)
+    if region is None:
+        return []
+    return [tag for tag in region.find_all(*args, **kwargs) if not off_content(tag, region)]
+
+def content_text(soup, skip=()):
+    region = content(soup)
+    if region is None:
+        return ''
+    skip = ['nav', 'header', 'footer', 'script', 'style', *skip]
+    return ' '.join(text.strip() for text in region.find_all(string=True)
+                    if text.strip() and not text.find_parent(skip) and not off_content(text.parent, region))
+
+def only(values):
+    """The one distinct value in `values`, or None if there are none or several."""
+    values = set(value for value in values if value)
+    return values.pop() if len(values) == 1 else None
+
+def find_title(soup):
+    return only(heading.get_text(' ', strip=True) for heading in content_tags(soup, 'h1'))
+
+def parse_date_time(text):
+    dates, times = list(DATE.finditer(text)), {match.groups() for match in TIME.finditer(text)}
+    if not dates or len(times) != 1:
+        return None
+    days = set()
+    for date in dates:
+        if date.group(1):
+            days.add(datetime.strptime(f"{date.group(1)} {date.group(2)} {date.group(3)}", '%B %d %Y'))
+        else:
+            year = date.group(6)
+            days.add(datetime.strptime(f"{date.group(4)}/{date.group(5)}/{year}",
+                                       '%m/%d/%Y' if len(year) == 4 else '%m/%d/%y'))
+    if len(days) != 1:
+        return None
+    hour, minute, meridiem = times.pop()
+    return days.pop().strftime('%m/%d/%y ') + f"{int(hour):02d}:{minute}{meridiem.upper()}M"
+
+def parse_datetime_attribute(value):
+    if 'T' not in value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(EASTERN)
+    return parsed.strftime('%m/%d/%y %I:%M%p')
+
+def find_date_time(soup):
+    """The hearing's date and time as '%m/%d/%y %I:%M%p' Eastern, the format the prompt asks for."""
+    stamps = [parse_datetime_attribute(tag.get('datetime', '')) for tag in content_tags(soup, 'time')]
+    if any(stamps):
+        return only(stamps)
+    labeled = [parse_date_time(tag.get_text(' ', strip=True))
+               for tag in content_tags(soup, class_=re.compile('date|time', re.I))]
+    if any(labeled):
+        return only(labeled)
+    # Date and time in separate elements
+    return parse_date_time(content_text(soup))
+
+def find_location(soup):
+    labeled = [re.sub(r'^(?:Location|Room)\s*:?\s*', '', tag.get_text(' ', strip=True), flags=re.I)
+               for tag in content_tags(soup, class_=re.compile('location|room', re.I))]
+    if any(labeled):
+        return only(labeled)
+    return only(match.group(0) for match in ROOM.finditer(content_text(soup)))
+
+def find_witnesses(soup):
+    witnesses = []
+    for block in content_tags(soup, class_=re.compile(r'^(?:witness|vcard)', re.I)):
+        if block.find_parent(class_=re.compile(r'^(?:witness|vcard)', re.I)):
+            continue  # counted with its outer block
+        parts = [text for text in block.stripped_strings if text.lower().rstrip(':') not in WITNESS_LINKS]
+        if parts:
+            witnesses.append(', '.join(parts))
+    return witnesses
+
+def subcommittee_label(name):
+    """'Subcommittee on X' or 'X Subcommittee', for a subcommittee_dict key with or without that wording."""
+    core = re.escape(re.sub(r'^Subcommittee on (?:the )?|\s+Subcommittee$', '', name, flags=re.I))
+    return re.compile(rf'\bSubcommittee on (?:the )?{core}\b|\b{core} Subcommittee\b', re.I)
+
+def find_subcommittee(soup, committee_info):
+    """The subcommittee an explicit label names, 'Full Committee' when the page says so, or None when it is unclear.
+
+    A subcommittee name that only turns up in the title or description ("Tax
+    Policy and Economic Policy Outlook") does not count, as the prompt says.
+    """
+    names = [name for name in (committee_info.get('subcommittee_dict') or {}) if name != 'Full Committee']
+    if not names:
+        return 'Full Committee'
+    text = content_text(soup, skip=['h1'])
+    labeled = [name for name in names if subcommittee_label(name).search(text)]
+    # "International Economic Policy Subcommittee" also reads as an "Economic Policy Subcommittee" label
+    labeled = [name for name in labeled if not any(name != other and name in other for other in labeled)]
+    full_committee = FULL_COMMITTEE.search(text)
+    if full_committee and not labeled:
+        return 'Full Committee'
+    if len(labeled) == 1 and not full_committee:
+        return labeled[0]
+    return None
+
+def find_isvp(soup):
+    return only(frame['src'] for frame in content_tags(soup, 'iframe', src=re.compile(r'senate\.gov/isvp', re.I)))
+
+def find_youtube(soup):
+    frames = content_tags(soup, 'iframe', src=YOUTUBE)
+    if frames:
+        return only(frame['src'] for frame in frames)
+    return only(link['href'] for link in content_tags(soup, 'a', href=YOUTUBE))
+
+def common_fields(soup):
+    return {
+        'title': find_title(soup),
+        'date_time': find_date_time(soup),
+        'location': find_location(soup),
+        'witnesses': find_witnesses(soup),
+    }
+
+# Site templates, for register() once a site's saved pages pass bench_extractors
+
+def senate_isvp(soup, html_content, url):
+    """Senate committee pages that embed the Senate's ISVP player in an iframe."""
+    return {**common_fields(soup), 'video_link': find_isvp(soup) or find_youtube(soup)}
+
+def senate_archive_stream(soup, html_content, url):
+    """Pages that set the stream in an `archive_stream` variable; the prompt's answer for those is 'url'."""
+    video_link = 'url' if ARCHIVE_STREAM.search(html_content) else find_isvp(soup) or find_youtube(soup)
+    return {**common_fields(soup), 'video_link': video_link}
+
+def house_administration(soup, html_content, url):
+    """Committee on House Administration: the video is a link rather than an embed."""
+    links = (content_tags(soup, 'a', href=YOUTUBE)
+             or content_tags(soup, 'a', href=True, string=re.compile(r'watch|video|webcast', re.I)))
+    href = only(link['href'] for link in links)
+    return {**common_fields(soup), 'video_link': urljoin(url, href) if href else None}
+
+def house_youtube(soup, html_content, url):
+    """House committee pages that embed the hearing's YouTube stream."""
+    return {**common_fields(soup), 'video_link': find_youtube(soup)}
+
+TEMPLATES = {extractor.__name__: extractor
+             for extractor in (senate_isvp, senate_archive_stream, house_administration, house_youtube)}
+
+class ExtractionStats:
+    """Per-site counts of hearings answered without the LLM, partly, or by the LLM alone."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sites = {}
+
+    def record(self, url, outcome, seconds):
+        with self.lock:
+            site = self.sites.setdefault(normalize_netloc(url), {'hearings': 0, 'bypassed': 0, 'partial': 0,
+                                                                 'llm': 0, 'seconds': 0.0})
+            site['hearings'] += 1
+            site[outcome] += 1
+            site['seconds'] += seconds
+
+    def report(self):
+        with self.lock:
+            sites = sorted(self.sites.items(), key=lambda item: -item[1]['hearings'])
+        for netloc, site in sites:
+            print(f"{netloc}: {site['hearings']} hearings, {site['bypassed'] / site['hearings']:.0%} without the LLM, "
+                  f"{site['partial']} partly, {site['seconds'] / site['hearings'] * 1000:.0f}ms per hearing")
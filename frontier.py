@@ -0,0 +1,120 @@
+import hashlib
+import heapq
+import math
+from collections import deque
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl'}
+
+def canonicalize_url(url):
+    """Reduce a URL to the key used to decide whether two links are the same page.
+
+    http/https, a leading `www.`, default ports, trailing slashes, fragments and
+    tracking query parameters are all ignored. The result is only a dedup key;
+    the crawler still fetches the URL as it was found.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    netloc = (parts.hostname or '').lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    if parts.port and parts.port not in (80, 443):
+        netloc = f"{netloc}:{parts.port}"
+
+    path = parts.path.rstrip('/') or '/'
+
+    query = ''
+    if parts.query:
+        params = [
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+        ]
+        query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+def _url_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+class SeenSet:
+    """Exact seen-set that stores a 64-bit hash per URL instead of the string."""
+
+    def __init__(self):
+        self.hashes = set()
+
+    def add(self, key):
+        h = _url_hash(key)
+        if h in self.hashes:
+            return False
+        self.hashes.add(h)
+        return True
+
+    def __len__(self):
+        return len(self.hashes)
+
+class BloomFilter:
+    """Fixed-size seen-set for deep crawls; may rarely report an unseen URL as seen."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def add(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+
+        new = False
+        for i in range(self.num_hashes):
+            bit = (h1 + i * h2) % self.num_bits
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __len__(self):
+        return self.count
+
+class Frontier:
+    """Crawl queue that drops already-seen URLs at enqueue time.
+
+    FIFO (breadth-first) by default; pass `priority`, a function of
+    (url, depth) returning a sort key, to pop the lowest key first instead.
+    """
+
+    def __init__(self, bloom_capacity=None, priority=None):
+        self.seen = BloomFilter(bloom_capacity) if bloom_capacity else SeenSet()
+        self.priority = priority
+        self.queue = [] if priority else deque()
+        self.counter = 0
+
+    def mark(self, url):
+        """Record `url` as seen; returns False if it (or an equivalent URL) already was."""
+        return self.seen.add(canonicalize_url(url))
+
+    def push(self, url, depth):
+        if not self.mark(url):
+            return False
+        if self.priority:
+            heapq.heappush(self.queue, (self.priority(url, depth), self.counter, url, depth))
+            self.counter += 1
+        else:
+            self.queue.append((url, depth))
+        return True
+
+    def pop(self):
+        if self.priority:
+            _, _, url, depth = heapq.heappop(self.queue)
+            return url, depth
+        return self.queue.popleft()
+
+    def __len__(self):
+        return len(self.queue)
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import http_client
+from frontier import canonicalize_url
+
+class CachedResponse:
+    """The parts of a requests/httpx response the crawler uses, served from disk."""
+
+    def __init__(self, url, content, meta):
+        self.url = url
+        self.content = content
+        self.status_code = meta['status_code']
+        self.headers = meta['headers']
+        self.encoding = meta.get('encoding') or 'utf-8'
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+class HttpCache:
+    """On-disk HTTP cache keyed by canonical URL.
+
+    Entries younger than `ttl` seconds are served without touching the network.
+    Older entries are revalidated with If-None-Match / If-Modified-Since, and a
+    304 is answered from disk. Least recently used entries are evicted once the
+    bodies exceed `max_bytes`.
+    """
+
+    def __init__(self, directory='.http_cache', ttl=7 * 24 * 3600, max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0}
+        os.makedirs(directory, exist_ok=True)
+
+        # key -> [size, last_used]
+        self.index = {}
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                try:
+                    meta = self._read_meta(name[:-5])
+                    self.index[name[:-5]] = [meta['size'], meta['last_used']]
+                except (OSError, ValueError, KeyError):
+                    continue
+        self.total_bytes = sum(size for size, _ in self.index.values())
+
+    def _key(self, url):
+        return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def _tmp_path(self, key, ext):
+        # Jobs sharing the cache can fetch the same URL at once; each thread writes its own temp file
+        return os.path.join(self.directory, f"{key}.{ext}.{threading.get_ident()}.tmp")
+
+    def _read_meta(self, key):
+        with open(self._path(key, 'json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, key, meta):
+        tmp = self._tmp_path(key, 'json')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(key, 'json'))
+
+    def lookup(self, url):
+        """Return (meta, is_fresh) for a cached URL, or (None, False)."""
+        key = self._key(url)
+        if key not in self.index:
+            return None, False
+        try:
+            meta = self._read_meta(key)
+        except (OSError, ValueError):
+            return None, False
+        return meta, time.time() - meta['fetched_at'] < self.ttl
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def serve_path(self, url, meta, revalidated=False):
+        """Count a hit and return the path of the cached body."""
+        key = self._key(url)
+        now = time.time()
+        meta['last_used'] = now
+        if revalidated:
+            meta['fetched_at'] = now
+        self._write_meta(key, meta)
+
+        with self.lock:
+            self.index[key][1] = now
+            self.stats['revalidated' if revalidated else 'hits'] += 1
+            self.stats['bytes_saved'] += meta['size']
+        return self._path(key, 'body')
+
+    def serve(self, url, meta, revalidated=False):
+        with open(self.serve_path(url, meta, revalidated), 'rb') as f:
+            content = f.read()
+        return CachedResponse(url, content, meta)
+
+    def _commit(self, url, response, size):
+        key = self._key(url)
+        now = time.time()
+        meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() == 'content-type'},
+            'encoding': response.encoding,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': now,
+            'last_used': now,
+            'size': size,
+        }
+        self._write_meta(key, meta)
+
+        with self.lock:
+            old = self.index.get(key)
+            self.total_bytes += size - (old[0] if old else 0)
+            self.index[key] = [size, now]
+            self._evict()
+        return self._path(key, 'body')
+
+    def store(self, url, response):
+        with self.lock:
+            self.stats['misses'] += 1
+        if response.status_code != 200:
+            return
+
+        content = response.content
+        key = self._key(url)
+        tmp = self._tmp_path(key, 'body')
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, self._path(key, 'body'))
+        self._commit(url, response, len(content))
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self.index.items(), key=lambda item: item[1][1]):
+            for ext in ('body', 'json'):
+                try:
+                    os.remove(self._path(key, ext))
+                except OSError:
+                    pass
+            del self.index[key]
+            self.total_bytes -= size
+            if self.total_bytes <= self.max_bytes:
+                break
+
+    def get(self, url, **kwargs):
+        meta, fresh = self.lookup(url)
+        if fresh:
+            return self.serve(url, meta)
+
+        headers = {**kwargs.pop('headers', {}), **self.conditional_headers(meta)}
+        response = http_client.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and meta:
+            return self.serve(url, meta, revalidated=True)
+        self.store(url, response)
+        return response
+
+    def get_to_file(self, url, max_bytes=None, **kwargs):
+        """Like get(), but streams the body into the cache and returns its path."""
+        meta, fresh = self.lookup(url)
+        if fresh:
+            return self.serve_path(url, meta)
+
+        headers = {**kwargs.pop('headers', {}), **self.conditional_headers(meta)}
+        with http_client.get(url, headers=headers, stream=True, **kwargs) as response:
+            if response.status_code == 304 and meta:
+                return self.serve_path(url, meta, revalidated=True)
+            with self.lock:
+                self.stats['misses'] += 1
+            response.raise_for_status()
+
+            key = self._key(url)
+            tmp = self._tmp_path(key, 'body')
+            try:
+                size = http_client.stream_to_file(response, tmp, max_bytes)
+            except Exception:
+                os.remove(tmp)
+                raise
+            os.replace(tmp, self._path(key, 'body'))
+            return self._commit(url, response, size)
+
+    async def aget(self, url, client, **kwargs):
+        meta, fresh = self.lookup(url)
+        if fresh:
+            return self.serve(url, meta)
+
+        headers = {**kwargs.pop('headers', {}), **self.conditional_headers(meta)}
+        response = await http_client.aget(client, url, headers=headers, **kwargs)
+        if response.status_code == 304 and meta:
+            return self.serve(url, meta, revalidated=True)
+        self.store(url, response)
+        return response
+
+    def report(self):
+        s = self.stats
+        print(f"HTTP cache: {s['hits']} hits, {s['revalidated']} revalidated (304), "
+              f"{s['misses']} misses, {s['bytes_saved'] / 1024 ** 2:.1f} MiB not re-downloaded")
+
+class TTLCache:
+    """Small JSON-file cache for API results keyed on a tuple of strings."""
+
+    def __init__(self, path, ttl=24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._entries = None
+
+    @property
+    def entries(self):
+        # Read on first use so that constructing the cache (e.g. at import) touches no files
+        if self._entries is None:
+            with self.lock:
+                if self._entries is None:
+                    try:
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            self._entries = json.load(f)
+                    except (OSError, ValueError):
+                        self._entries = {}
+        return self._entries
+
+    def _key(self, key):
+        return json.dumps(list(key))
+
+    def get(self, key):
+        entry = self.entries.get(self._key(key))
+        if entry and time.time() - entry['stored_at'] < self.ttl:
+            return entry['value']
+        return None
+
+    def set(self, key, value):
+        self.entries  # loaded before taking the lock, which loading needs
+        with self.lock:
+            now = time.time()
+            entries = {k: v for k, v in self._entries.items() if now - v['stored_at'] < self.ttl}
+            entries[self._key(key)] = {'stored_at': now, 'value': value}
+            self._entries = entries
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.path)
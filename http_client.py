@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import backoff
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_TRIES = 5
+MAX_WAIT = 120
+POOL_HOSTS = 50
+POOL_SIZE_PER_HOST = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+class LatencyMetrics:
+    """Per-host request counts and latencies for everything sent through this module."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.retries = 0
+
+    def record(self, url, seconds):
+        host = urlparse(url).netloc
+        with self.lock:
+            self.latencies.setdefault(host, []).append(seconds)
+
+    def record_retry(self, details):
+        with self.lock:
+            self.retries += 1
+
+    def summary(self):
+        with self.lock:
+            all_latencies = sorted(s for host in self.latencies.values() for s in host)
+        if not all_latencies:
+            return {'requests': 0, 'retries': self.retries}
+        return {
+            'requests': len(all_latencies),
+            'retries': self.retries,
+            'mean': sum(all_latencies) / len(all_latencies),
+            'p50': all_latencies[len(all_latencies) // 2],
+            'p95': all_latencies[int(len(all_latencies) * 0.95)],
+        }
+
+    def report(self):
+        s = self.summary()
+        if not s['requests']:
+            print("HTTP: no requests sent")
+            return
+        print(f"HTTP: {s['requests']} requests, {s['retries']} retries, "
+              f"mean {s['mean'] * 1000:.0f}ms, p50 {s['p50'] * 1000:.0f}ms, p95 {s['p95'] * 1000:.0f}ms")
+
+metrics = LatencyMetrics()
+
+def get_session():
+    """The process-wide requests.Session, created on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE_PER_HOST)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def async_client(**kwargs):
+    """An httpx.AsyncClient with the same pooling and timeout defaults."""
+    kwargs.setdefault('follow_redirects', True)
+    kwargs.setdefault('timeout', httpx.Timeout(DEFAULT_TIMEOUT[1], connect=DEFAULT_TIMEOUT[0]))
+    kwargs.setdefault('limits', httpx.Limits(max_connections=POOL_HOSTS * POOL_SIZE_PER_HOST,
+                                             max_keepalive_connections=POOL_HOSTS))
+    return httpx.AsyncClient(**kwargs)
+
+def _retry_after(response):
+    # Accepts a response, or an exception carrying one (openai.APIStatusError)
+    response = getattr(response, 'response', response)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return min(MAX_WAIT, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(MAX_WAIT, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
+
+def retry_wait():
+    """backoff wait generator: Retry-After when the server sends one, else full-jitter exponential."""
+    attempt = 0
+    value = yield
+    while True:
+        delay = _retry_after(value)
+        if delay is None:
+            delay = random.uniform(0, min(MAX_WAIT, 2 ** attempt))
+        attempt += 1
+        value = yield delay
+
+def _should_retry(response):
+    return response.status_code in RETRY_STATUSES
+
+def request(method, url, max_tries=MAX_TRIES, **kwargs):
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+    @backoff.on_exception(retry_wait, (requests.ConnectionError, requests.Timeout),
+                          max_tries=max_tries, jitter=None, on_backoff=metrics.record_retry)
+    @backoff.on_predicate(retry_wait, _should_retry,
+                          max_tries=max_tries, jitter=None, on_backoff=metrics.record_retry)
+    def send():
+        start = time.perf_counter()
+        try:
+            return get_session().request(method, url, **kwargs)
+        finally:
+            metrics.record(url, time.perf_counter() - start)
+
+    return send()
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def head(url, **kwargs):
+    return request('HEAD', url, **kwargs)
+
+def final_url(url, max_tries=MAX_TRIES):
+    """Where `url` ends up after redirects, found without downloading any response body."""
+    response = head(url, allow_redirects=True, max_tries=max_tries)
+    if response.status_code < 400:
+        return response.url
+    # Some servers refuse HEAD; a streamed GET stops once the last response's headers arrive
+    response = request('GET', url, allow_redirects=True, stream=True, max_tries=max_tries)
+    response.close()
+    return response.url
+
+def stream_to_file(response, path, max_bytes=None, chunk_size=1024 * 1024):
+    """Write a `stream=True` response body to `path` without holding it in memory."""
+    length = response.headers.get('Content-Length')
+    if max_bytes and length and length.isdigit() and int(length) > max_bytes:
+        raise ValueError(f"{response.url} is {int(length)} bytes, over the {max_bytes} byte limit")
+
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            written += len(chunk)
+            if max_bytes and written > max_bytes:
+                raise ValueError(f"{response.url} exceeded the {max_bytes} byte limit")
+            f.write(chunk)
+    return written
+
+async def aget(client, url, max_tries=MAX_TRIES, **kwargs):
+    @backoff.on_exception(retry_wait, httpx.TransportError,
+                          max_tries=max_tries, jitter=None, on_backoff=metrics.record_retry)
+    @backoff.on_predicate(retry_wait, _should_retry,
+                          max_tries=max_tries, jitter=None, on_backoff=metrics.record_retry)
+    async def send():
+        start = time.perf_counter()
+        try:
+            return await client.get(url, **kwargs)
+        finally:
+            metrics.record(url, time.perf_counter() - start)
+
+    return await send()
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+import backoff
+import openai
+from openai.types.chat import ChatCompletion
+
+from http_client import retry_wait
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+# USD per million (prompt, completion) tokens, for the cache's savings estimate
+MODEL_PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4-0125-preview': (10.00, 30.00),
+    'gpt-4-turbo': (10.00, 30.00),
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The process-wide OpenAI client, created on first use (which is when OPENAI_API_KEY is read)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = openai.OpenAI()
+    return _client
+
+def set_client(client):
+    """Make get_client() return `client`, e.g. one pointed at a local test server."""
+    global _client
+    _client = client
+
+def parse_reset(value):
+    """Seconds from an x-ratelimit-reset-* value such as '20ms', '1s' or '6m0s'."""
+    parts = DURATION_PART.findall(value or '')
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget shared by every LLM call in the process.
+
+    Budgets refill continuously. Whenever a response carries OpenAI's
+    x-ratelimit-* headers the limits and remaining budget are taken from the
+    server, so the configured values only matter until the first response.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=300000):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_available = float(requests_per_minute)
+        self.tokens_available = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests_available = min(self.requests_per_minute,
+                                      self.requests_available + elapsed * self.requests_per_minute / 60)
+        self.tokens_available = min(self.tokens_per_minute,
+                                    self.tokens_available + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens):
+        """Block until one request of roughly `tokens` tokens fits in both budgets."""
+        while True:
+            with self.lock:
+                self._refill()
+                tokens = min(tokens, self.tokens_per_minute)
+                if self.updated < self.paused_until:
+                    wait = self.paused_until - self.updated
+                elif self.requests_available >= 1 and self.tokens_available >= tokens:
+                    self.requests_available -= 1
+                    self.tokens_available -= tokens
+                    return
+                else:
+                    wait = max((1 - self.requests_available) * 60 / self.requests_per_minute,
+                               (tokens - self.tokens_available) * 60 / self.tokens_per_minute)
+            time.sleep(max(wait, 0.01))
+
+    def update_from_headers(self, headers):
+        with self.lock:
+            self._refill()
+            for kind in ('requests', 'tokens'):
+                limit = headers.get(f'x-ratelimit-limit-{kind}')
+                remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+                try:
+                    if limit:
+                        setattr(self, f'{kind}_per_minute', float(limit))
+                    if remaining is not None:
+                        # In-flight requests are already deducted locally, so never raise the budget
+                        available = min(getattr(self, f'{kind}_available'), float(remaining))
+                        setattr(self, f'{kind}_available', available)
+                except ValueError:
+                    continue
+                # An exhausted budget pauses every caller until the server says it resets
+                reset = parse_reset(headers.get(f'x-ratelimit-reset-{kind}'))
+                if remaining == '0' and reset:
+                    self.paused_until = max(self.paused_until, self.updated + reset)
+
+def estimate_tokens(messages):
+    # ~4 characters per token is close enough for budgeting
+    return sum(len(message['content']) for message in messages) // 4
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prices = next((MODEL_PRICES[name] for name in sorted(MODEL_PRICES, key=len, reverse=True)
+                   if model.startswith(name)), None)
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1e6
+
+class ResponseCache:
+    """Chat completions stored in SQLite, keyed by a hash of the model, messages and options.
+
+    Entries older than `ttl` seconds are ignored and overwritten. Least
+    recently used entries are evicted once the stored responses exceed
+    `max_bytes`. With `bypass=True` nothing is read from the cache but fresh
+    responses are still written, which refreshes it.
+    """
+
+    def __init__(self, path='.llm_cache.sqlite', ttl=30 * 24 * 3600, max_bytes=512 * 1024 ** 2, bypass=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'tokens_saved': 0, 'dollars_saved': 0.0}
+        self._db = None
+
+    @property
+    def db(self):
+        # Opened on first use so that constructing the cache (e.g. at import) touches no files
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def key(self, kwargs):
+        return hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        if self.bypass:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT model, response, prompt_tokens, completion_tokens, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or now - row[4] >= self.ttl:
+                self.stats['misses'] += 1
+                return None
+            model, response, prompt_tokens, completion_tokens, _ = row
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.stats['hits'] += 1
+            self.stats['tokens_saved'] += (prompt_tokens or 0) + (completion_tokens or 0)
+            self.stats['dollars_saved'] += estimate_cost(model, prompt_tokens or 0, completion_tokens or 0)
+        return ChatCompletion.model_validate_json(response)
+
+    def set(self, key, completion):
+        response = completion.model_dump_json()
+        usage = completion.usage
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, completion.model, response, len(response),
+                 usage.prompt_tokens if usage else None, usage.completion_tokens if usage else None, now, now),
+            )
+            self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def report(self):
+        s = self.stats
+        print(f"LLM cache: {s['hits']} hits, {s['misses']} misses, "
+              f"~{s['tokens_saved']} tokens / ${s['dollars_saved']:.2f} saved")
+
+def chat_completion(client, limiter=None, max_tries=8, cache=None, **kwargs):
+    """client.chat.completions.create, paced by `limiter` and retried on 429/5xx/connection errors.
+
+    When `cache` is a ResponseCache, identical requests are answered from it.
+    """
+    if cache is not None:
+        key = cache.key(kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    client = client.with_options(max_retries=0)
+    tokens = estimate_tokens(kwargs['messages']) + (kwargs.get('max_tokens') or 0)
+
+    def on_backoff(details):
+        response = getattr(details.get('exception'), 'response', None)
+        if limiter and response is not None:
+            limiter.update_from_headers(response.headers)
+
+    @backoff.on_exception(retry_wait, RETRYABLE_ERRORS, max_tries=max_tries, jitter=None, on_backoff=on_backoff)
+    def send():
+        if limiter:
+            limiter.acquire(tokens)
+        raw = client.chat.completions.with_raw_response.create(**kwargs)
+        if limiter:
+            limiter.update_from_headers(raw.headers)
+        return raw.parse()
+
+    completion = send()
+    if cache is not None:
+        cache.set(key, completion)
+    return completion
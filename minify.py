@@ -0,0 +1,68 @@
+import re
+
+from bs4 import BeautifulSoup, Comment
+
+from tokens import count_tokens, encode, get_encoding
+
+# Page chrome and markup that carries no hearing details
+DROP_TAGS = ('script', 'style', 'noscript', 'template', 'svg', 'nav', 'footer', 'aside', 'form', 'button',
+             'select', 'input', 'link', 'meta', 'img', 'picture', 'canvas')
+KEEP_ATTRIBUTES = ('href', 'src', 'data-src', 'datetime', 'title')
+# Elements worth keeping even when they hold no text
+MEDIA_TAGS = ('iframe', 'video', 'audio', 'source', 'embed', 'object', 'a')
+KEEP_EMPTY = MEDIA_TAGS + ('script', 'br')
+# Scripts that point at the hearing video, e.g. hsgac's archive_stream variable
+KEEP_SCRIPT = re.compile(r'archive_stream|youtube\.com|youtu\.be|\.mp4|\.m3u8|isvp', re.I)
+# class/id values that hint at what an element holds
+KEEP_CLASS = re.compile(r'witness|date|time|location|room|title|video|hearing|subcommittee', re.I)
+TRUNCATED = "\n<!-- truncated; video links further down the page: -->\n"
+WHITESPACE = re.compile(r'\s+')
+VIDEO_URL = re.compile(r'''https?://[^\s"'<>]*(?:youtube|youtu\.be|isvp|vimeo|video|\.mp4|\.m3u8)[^\s"'<>]*''', re.I)
+
+def minify_html(content, drop_tags=DROP_TAGS, keep_attributes=KEEP_ATTRIBUTES):
+    """Strip a hearing page down to the markup the extraction prompt needs.
+
+    Drops `drop_tags` (except scripts that reference the hearing video),
+    comments, attributes not in `keep_attributes` (class and id are kept
+    when they name a hearing field), empty elements and repeated whitespace.
+    Iframes, video and links, headings and all visible text are kept.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for tag in soup.find_all(drop_tags):
+        if tag.decomposed:
+            continue  # inside a tag already dropped
+        if tag.name == 'script' and KEEP_SCRIPT.search(tag.string or ''):
+            tag.attrs = {}
+            continue
+        tag.decompose()
+    for tag in soup.find_all(True):
+        attributes = {name: value for name, value in tag.attrs.items() if name in keep_attributes}
+        for name in ('class', 'id'):
+            value = tag.get(name)
+            value = ' '.join(value) if isinstance(value, list) else value
+            if value and KEEP_CLASS.search(value):
+                attributes[name] = value
+        tag.attrs = attributes
+    # Innermost first, so wrappers left empty by their children are dropped too. The only
+    # scripts left are the kept video ones, which get_text() does not count as text.
+    for tag in reversed(soup.find_all(True)):
+        if tag.name not in KEEP_EMPTY and not tag.find(MEDIA_TAGS + ('script',)) and not tag.get_text(strip=True):
+            tag.decompose()
+    return WHITESPACE.sub(' ', str(soup)).strip()
+
+def fit_token_budget(content, max_tokens):
+    """Cut `content` to about `max_tokens`, keeping video links from the part cut off.
+
+    Hearing details sit near the top of the page, so the start is kept; any
+    iframe or video URL found only in the dropped tail is listed after it.
+    """
+    tokens = encode(content)
+    if len(tokens) <= max_tokens:
+        return content
+    links = list(dict.fromkeys(VIDEO_URL.findall(content)))[:20]
+    note = TRUNCATED + '\n'.join(links) if links else ''
+    head = get_encoding().decode(tokens[:max(0, max_tokens - count_tokens(note))])
+    missing = [link for link in links if link not in head]
+    return head + (TRUNCATED + '\n'.join(missing) if missing else '')
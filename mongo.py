@@ -0,0 +1,21 @@
+import threading
+
+from pymongo.mongo_client import MongoClient
+from pymongo.server_api import ServerApi
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(uri):
+    """The process-wide MongoClient for `uri`, created on first use.
+
+    MongoClient connects in the background on first operation and is safe
+    to share between threads, so one per cluster is enough.
+    """
+    client = _clients.get(uri)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(uri)
+            if client is None:
+                client = _clients[uri] = MongoClient(uri, server_api=ServerApi('1'))
+    return client
@@ -0,0 +1,93 @@
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from prefilter import words
+
+class MinHasher:
+    """MinHash signatures over word shingles, for estimating Jaccard similarity between texts.
+
+    Shingles are CRC32 hashes of `shingle_size` consecutive words. Each of the
+    `num_perm` hash functions is a multiply-shift hash over them.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=5, seed=0):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # Odd multipliers make multiply-shift a universal hash family; uint64 arithmetic wraps mod 2**64
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        tokens = words(text)
+        size = min(self.shingle_size, len(tokens)) or 1
+        return np.unique(np.fromiter(
+            (zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8')) for i in range(max(1, len(tokens) - size + 1))),
+            dtype=np.uint64,
+        ))
+
+    def signature(self, text):
+        shingles = self.shingles(text)
+        signature = np.empty(self.num_perm, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for i in range(self.num_perm):
+                signature[i] = ((self.a[i] * shingles + self.b[i]) >> np.uint64(32)).min()
+        return signature
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(first == second))
+
+class LSHIndex:
+    """Banded locality-sensitive hashing over MinHash signatures.
+
+    Documents whose signatures agree on every row of any band become
+    candidates, so finding near-duplicates does not compare every pair.
+    16 bands of 8 rows start catching pairs around 0.7 similarity.
+    """
+
+    def __init__(self, bands=16):
+        self.bands = bands
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+        self.signatures = {}
+
+    def add(self, key, signature):
+        """Index `signature` and return the keys already indexed that share a band with it."""
+        rows = len(signature) // self.bands
+        candidates = set()
+        for band, buckets in enumerate(self.buckets):
+            bucket = buckets[signature[band * rows:(band + 1) * rows].tobytes()]
+            candidates.update(bucket)
+            bucket.append(key)
+        self.signatures[key] = signature
+        return candidates
+
+def cluster_near_duplicates(signatures, threshold=0.8, bands=16):
+    """Group keys whose signatures are at least `threshold` similar.
+
+    `signatures` is an iterable of (key, signature). Returns a list of
+    clusters (lists of keys, in input order) with more than one member.
+    """
+    index = LSHIndex(bands)
+    parent = {}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    order = []
+    for key, signature in signatures:
+        parent[key] = key
+        order.append(key)
+        for candidate in index.add(key, signature):
+            if similarity(signature, index.signatures[candidate]) >= threshold:
+                parent[find(key)] = find(candidate)
+
+    clusters = defaultdict(list)
+    for key in order:
+        clusters[find(key)].append(key)
+    return [cluster for cluster in clusters.values() if len(cluster) > 1]
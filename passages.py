@@ -0,0 +1,67 @@
+import re
+
+# Markdown headings from the PDF conversion and municipal code section headings
+SECTION_START = re.compile(r'^(?:#{1,6}\s|(?:sec(?:tion)?\.?|§+|article|chapter|title)\s*[\dIVXivx][\w.\-]*)',
+                           re.IGNORECASE | re.MULTILINE)
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+def split_sections(text):
+    """Split at headings; text without any falls back to paragraphs."""
+    starts = [match.start() for match in SECTION_START.finditer(text)]
+    if not starts:
+        return [part for part in PARAGRAPH_BREAK.split(text) if part.strip()]
+    if starts[0] != 0:
+        starts.insert(0, 0)
+    ends = starts[1:] + [len(text)]
+    return [text[start:end] for start, end in zip(starts, ends) if text[start:end].strip()]
+
+def split_long(section, max_chars):
+    # Sections longer than a passage are cut at whitespace
+    while len(section) > max_chars:
+        cut = section.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield section[:cut]
+        section = section[cut:]
+    if section.strip():
+        yield section
+
+def split_passages(text, tokens_per_char=0.25, max_tokens=800):
+    """Passages of up to about `max_tokens`, following section boundaries.
+
+    Sizes are estimated from `tokens_per_char` (the document's own ratio when
+    it has been tokenized) so the text is not encoded again. Short neighbouring
+    sections are merged.
+    """
+    max_chars = max(1, int(max_tokens / max(tokens_per_char, 1e-6)))
+    passages = []
+    current = ''
+    for section in split_sections(text):
+        for piece in split_long(section, max_chars):
+            if current and len(current) + len(piece) > max_chars:
+                passages.append(current)
+                current = ''
+            current += piece
+    if current.strip():
+        passages.append(current)
+    return passages
+
+def rank_passages(passages, score):
+    """Passage indexes, most relevant first."""
+    scores = [score(passage) for passage in passages]
+    return sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)
+
+def take_budget(passages, ranked, tokens_per_char, budget):
+    """Split `ranked` into the indexes that fit in `budget` tokens and the rest.
+
+    The most relevant passage is always taken, even on its own over budget.
+    """
+    taken = []
+    used = 0
+    for position, index in enumerate(ranked):
+        size = len(passages[index]) * tokens_per_char
+        if taken and used + size > budget:
+            return taken, ranked[position:]
+        taken.append(index)
+        used += size
+    return taken, []
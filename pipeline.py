@@ -1,107 +1,112 @@
 from browse import get_ordinance_links
 from crawler import crawl_websites
-from process import process_files, write_to_csv, summarize, count_tokens
-import pandas as pd
+from http_cache import HttpCache
+from process import SUMMARY_MODEL, process_files, write_to_csv, summarize, llm_cache
+from summary import summarize_documents
+from store import ContentStore
+import argparse
 import os
 
-def create_efficient_chunks(content, max_tokens=100000):
-    chunks = []
-    current_chunk = ""
-    current_tokens = 0
-
-    for line in content.split('\n'):
-        line_tokens = count_tokens(line)
-        if current_tokens + line_tokens > max_tokens:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = line
-            current_tokens = line_tokens
-        else:
-            current_chunk += '\n' + line
-            current_tokens += line_tokens
-
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-
-    return chunks
-
-# Get ordinance links
-issue = "short term rental"
-city_county = "Humboldt County"
-state = "CA"
-
-ordinance_links = get_ordinance_links(issue, city_county, state)
-print(f"Found {len(ordinance_links)} ordinance links")
-for link in ordinance_links:
-    print(link)
-
-# Crawl websites from ordinance links
-pdf_links, visited_pages = crawl_websites(ordinance_links, delay=1)
-
-print(f"Crawled {len(visited_pages)} pages.")
-print(f"Found and processed {len(pdf_links)} PDF links:")
-for link in pdf_links:
-    print(link)
-
-# Process HTML files and PDFs
-crawled_directory = 'crawled_pages'
-output_file = 'business_impact_assessment.csv'
-
-results, total_tokens = process_files(crawled_directory, issue, city_county, state)
-
-# Write results to CSV
-write_to_csv(results, output_file)
-
-# Print summary
-impacting_files = sum(result['impacts_business'] for result in results)
-total_files = len(results)
-print(f"Files that impact the business: {impacting_files} out of {total_files}")
-print(f"Total token count across all files: {total_tokens}")
-print(f"Results written to {output_file}")
-
-# Read the CSV file
-df = pd.read_csv('business_impact_assessment.csv')
-
-# Take the rows that have 'impacts_business' as True and concatenate those files into a single text file
-impacting_files = df[df['impacts_business'] == 1]
-output_text_file = 'impacting_files.txt'
-
-with open(output_text_file, 'w', encoding='utf-8') as textfile:
-    for file_path in impacting_files['file_path']:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            textfile.write(file.read())
-            textfile.write('\n\n')
-
-print(f"Concatenated text of impacting files written to {output_text_file}")
-
-# Read the concatenated content
-output_text_file = 'impacting_files.txt'
-with open(output_text_file, 'r', encoding='utf-8') as file:
-    content = file.read()
-
-# Create efficient chunks
-chunks = create_efficient_chunks(content)
-
-# Summarize each chunk
-chunk_summaries = []
-for i, chunk in enumerate(chunks):
-    print(f"Summarizing chunk {i+1} of {len(chunks)}...")
-    chunk_summary = summarize(chunk, issue, city_county, state)
-    chunk_summaries.append(chunk_summary)
-
-# Combine chunk summaries
-combined_summary = "\n\n".join(chunk_summaries)
-
-# Final summarization of combined summaries
-if len(chunks) > 1:
-    print("Creating final summary...")
-    final_summary = summarize(combined_summary, issue, city_county, state)
-else:
-    final_summary = combined_summary
-
-# Write the final summary to a text file
-output_summary_file = 'business_impact_summary.txt'
-with open(output_summary_file, 'w', encoding='utf-8') as file:
-    file.write(final_summary)
-
-print(f"Final summary written to {output_summary_file}")
\ No newline at end of file
+def run_pipeline(issue, city_county, state, output_dir='.', crawled_directory='crawled_pages', cache=None,
+                 limiter=None, incremental=True, concurrency=8, prefilter_threshold=None, store=None,
+                 near_duplicate_threshold=None):
+    """Search, crawl, classify and summarize one (issue, jurisdiction) job.
+
+    The CSV and summary are written to `output_dir`. Pass a shared HttpCache
+    and crawler.HostRateLimiter, and the ContentStore for `crawled_directory`
+    as `store`, when running several jobs at once. A prefilter_threshold
+    turns on the local relevance prefilter, and a near_duplicate_threshold
+    classifies near-duplicate documents once.
+    Returns the paths written and the job's counts.
+    """
+    # Reuse classifications and summaries of unchanged documents from earlier runs for the same jurisdiction
+    run_key = f"{issue}|{city_county}|{state}"
+    os.makedirs(output_dir, exist_ok=True)
+    store = store or ContentStore(crawled_directory)
+
+    # Get ordinance links
+    ordinance_links = get_ordinance_links(issue, city_county, state)
+    print(f"Found {len(ordinance_links)} ordinance links")
+    for link in ordinance_links:
+        print(link)
+
+    # Crawl websites from ordinance links
+    pdf_links, visited_pages = crawl_websites(ordinance_links, delay=1, concurrency=10, cache=cache or HttpCache(),
+                                              staged=True, limiter=limiter, store=store)
+
+    print(f"Crawled {len(visited_pages)} pages.")
+    print(f"Found and processed {len(pdf_links)} PDF links:")
+    for link in pdf_links:
+        print(link)
+
+    # Process HTML files and PDFs
+    output_file = os.path.join(output_dir, 'business_impact_assessment.csv')
+
+    # Only what this crawl reached, not pages left in the store by other counties' runs
+    crawled_urls = set(visited_pages) | set(pdf_links)
+    results, total_tokens = process_files(crawled_directory, issue, city_county, state, concurrency=concurrency,
+                                          urls=crawled_urls, run_key=run_key if incremental else None,
+                                          prefilter_threshold=prefilter_threshold,
+                                          near_duplicate_threshold=near_duplicate_threshold, store=store)
+
+    # Write results to CSV
+    write_to_csv(results, output_file)
+
+    # Print summary
+    impacting_files = sum(result['impacts_business'] for result in results)
+    total_files = len(results)
+    print(f"Files that impact the business: {impacting_files} out of {total_files}")
+    print(f"Total token count across all files: {total_tokens}")
+    print(f"Results written to {output_file}")
+
+    # Summarize the text of the documents that impact the business, read straight from the store.
+    # Near-duplicates share their representative's answer but only the representative is summarized.
+    impacting = [result for result in results if result['impacts_business'] and not result['duplicate_of']]
+    # Each document is summarized on its own, so only new or changed ones reach the LLM; the reduce levels run again
+    documents = ((result['content_hash'], store.read_text(result['content_hash'])) for result in impacting)
+    summary_key = f"{run_key}|{SUMMARY_MODEL}" if incremental else None
+
+    final_summary, levels = summarize_documents(
+        documents, lambda chunk: summarize(chunk, issue, city_county, state), concurrency=concurrency,
+        stored=(lambda text_hash: store.summary(summary_key, text_hash)) if summary_key else None,
+        save=(lambda text_hash, summaries: store.set_summary(summary_key, text_hash, summaries)) if summary_key else None)
+
+    # Write the final summary to a text file
+    output_summary_file = os.path.join(output_dir, 'business_impact_summary.txt')
+    with open(output_summary_file, 'w', encoding='utf-8') as file:
+        file.write(final_summary)
+
+    print(f"Final summary written to {output_summary_file}")
+    return {
+        'csv': output_file,
+        'summary': output_summary_file,
+        'links': len(ordinance_links),
+        'pages': len(visited_pages),
+        'documents': total_files,
+        'impacting': impacting_files,
+        'tokens': total_tokens,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Find, classify and summarize one jurisdiction's ordinances on an issue.")
+    parser.add_argument('issue', nargs='?', default="short term rental")
+    parser.add_argument('city_county', nargs='?', default="Humboldt County")
+    parser.add_argument('state', nargs='?', default="CA")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--crawled-directory', default='crawled_pages')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-incremental', action='store_true', help="re-classify documents seen in earlier runs")
+    parser.add_argument('--prefilter-threshold', type=float,
+                        help="reject documents scoring below this without asking the LLM (e.g. 0.5)")
+    parser.add_argument('--near-duplicate-threshold', type=float,
+                        help="classify documents at least this similar once (e.g. 0.8)")
+    args = parser.parse_args()
+
+    run_pipeline(args.issue, args.city_county, args.state, output_dir=args.output_dir,
+                 crawled_directory=args.crawled_directory, incremental=not args.no_incremental,
+                 concurrency=args.concurrency, prefilter_threshold=args.prefilter_threshold,
+                 near_duplicate_threshold=args.near_duplicate_threshold)
+    llm_cache.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import math
+import re
+from collections import Counter
+
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to'}
+# Jurisdiction words that say nothing about which jurisdiction
+GENERIC_PLACE_WORDS = {'city', 'county', 'town', 'township', 'village', 'borough', 'parish'}
+# Tuned with benchmarks/eval_prefilter.py for no lost recall, on a generated corpus only
+DEFAULT_THRESHOLD = 0.5
+# On a topical crawl nearly every page says "rental" and the county, which would
+# give exactly the terms that matter an IDF near 0
+IDF_FLOOR = 1.0
+
+def words(text):
+    return WORD.findall(text.lower())
+
+def stem(word):
+    # Enough to match "rentals"/"rental" and "ordinances"/"ordinance"
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+def terms(text):
+    return [stem(word) for word in words(text) if word not in STOPWORDS]
+
+class Prefilter:
+    """BM25 relevance of each document to an issue and jurisdiction, scored locally.
+
+    Issue terms carry full weight and jurisdiction terms half. IDF comes from
+    the documents passed to fit(), i.e. the current crawl, and never drops
+    below IDF_FLOOR, so the more relevant a crawl is the more it keeps
+    rather than the less. A document that
+    contains the issue as a phrase ("short-term rentals") is always kept; any
+    other document is kept when its score reaches `threshold`. The default is
+    low because a missed ordinance costs more than an extra LLM call.
+    """
+
+    def __init__(self, issue, city_county, state, threshold=DEFAULT_THRESHOLD, k1=1.5, b=0.75):
+        self.threshold = threshold
+        self.k1 = k1
+        self.b = b
+        self.issue_terms = set(terms(issue))
+        self.place_terms = {t for t in terms(f"{city_county} {state}") if t not in GENERIC_PLACE_WORDS}
+        self.place_terms -= self.issue_terms
+        issue_words = [re.escape(word) for word in words(issue)]
+        self.issue_phrase = re.compile(r"\b" + r"[\s\-]+".join(issue_words) + r"s?\b", re.IGNORECASE) if issue_words else None
+        self.document_frequency = Counter()
+        self.documents = 0
+        self.average_length = 1.0
+
+    def fit(self, texts):
+        lengths = []
+        for text in texts:
+            document_terms = terms(text)
+            lengths.append(len(document_terms))
+            self.document_frequency.update(set(document_terms) & (self.issue_terms | self.place_terms))
+        self.documents = len(lengths)
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+        return self
+
+    def idf(self, term):
+        df = self.document_frequency[term]
+        return max(math.log(1 + (self.documents - df + 0.5) / (df + 0.5)), IDF_FLOOR)
+
+    def score(self, text):
+        document_terms = terms(text)
+        frequencies = Counter(document_terms)
+        length_norm = self.k1 * (1 - self.b + self.b * len(document_terms) / self.average_length)
+        score = 0.0
+        for query_terms, weight in ((self.issue_terms, 1.0), (self.place_terms, 0.5)):
+            for term in query_terms:
+                tf = frequencies[term]
+                if tf:
+                    score += weight * self.idf(term) * tf * (self.k1 + 1) / (tf + length_norm)
+        return score
+
+    def keep(self, text):
+        """Return (keep, score)."""
+        score = self.score(text)
+        if self.issue_phrase is not None and self.issue_phrase.search(text):
+            return True, score
+        return score >= self.threshold, score
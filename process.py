@@ -1,20 +1,25 @@
 import os
 from bs4 import BeautifulSoup
 from typing import Callable
-import tiktoken
 import csv
-from openai import OpenAI
 import logging
 from typing import List
+from store import ContentStore
+from llm import RateLimiter, ResponseCache, chat_completion, estimate_cost, get_client
+from tokens import TokenizedText, count_tokens
+from prefilter import Prefilter
+from passages import rank_passages, split_passages, take_budget
+from neardup import MinHasher, cluster_near_duplicates
+from extract import main_text
+from concurrent.futures import ThreadPoolExecutor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-client = OpenAI(api_key=os.environ['OPENAI_API_KEY'])
-
-# Token counting functions
-def count_tokens(text: str) -> int:
-    encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+rate_limiter = RateLimiter()
+# LLM_CACHE_BYPASS=1 re-asks the model for everything (and refreshes the cache)
+llm_cache = ResponseCache(bypass=os.environ.get('LLM_CACHE_BYPASS') == '1')
+CLASSIFY_MODEL = "gpt-4-0125-preview"
+SUMMARY_MODEL = "gpt-4o-mini"
 
 # Text extraction functions
 def extract_text_from_html(content: str) -> str:
@@ -27,55 +32,207 @@ def extract_text_from_markdown(content: str) -> str:
 def extract_text(content: str, file_type: str) -> str:
     if file_type == 'html':
         return extract_text_from_html(content)
+    elif file_type == 'text':  # already extracted by the crawler
+        return content
     else:  # markdown
         return extract_text_from_markdown(content)
 
+def load_document(store: ContentStore, document: dict) -> tuple:
+    """Return (content, file_type) for a manifest entry, preferring the crawler's extracted text."""
+    if document['content_type'] == 'text/markdown':
+        return store.read_text(document['content_hash']), 'markdown'
+    if document['text_hash']:
+        return store.read_text(document['text_hash']), 'text'
+    return store.read_text(document['content_hash']), 'html'
+
 # File processing functions
-def process_file(file_path: str, content: str, file_type: str, issue, city_county, state) -> dict:
+def process_file(file_path: str, content: str, file_type: str, issue, city_county, state, prefilter: Prefilter = None,
+                 passage_budget: int = None) -> dict:
     text = extract_text(content, file_type)
-    token_count = count_tokens(text)
+    tokenized = TokenizedText(text)  # encoded once for the count, the chunks and the cost
+
+    # Clearly irrelevant pages are rejected locally instead of asking the model
+    sent_to_llm, score = prefilter.keep(text) if prefilter else (True, None)
     
     # LLM API call
-    impacts_business = call_llm_api(text, issue, city_county, state)
+    if not sent_to_llm:
+        impacts_business, tokens_sent = False, 0
+    elif passage_budget:
+        impacts_business, tokens_sent = call_llm_api_passages(tokenized, issue, city_county, state,
+                                                              prefilter, budget=passage_budget)
+    else:
+        impacts_business, tokens_sent = call_llm_api(text, issue, city_county, state, tokenized=tokenized), len(tokenized)
     
     return {
         'file_path': file_path,  # Changed from 'file_name' to 'file_path'
         'impacts_business': int(impacts_business),  # Convert boolean to 0 or 1
-        'token_count': token_count
+        'token_count': len(tokenized),
+        'tokens_sent': tokens_sent,
+        'estimated_cost': estimate_cost(CLASSIFY_MODEL, tokens_sent, 0),
+        'prefilter_score': score,
+        'sent_to_llm': int(sent_to_llm),
     }
 
-def process_files(directory: str, issue, city_county, state) -> tuple:
+def process_files(directory: str, issue, city_county, state, concurrency: int = 1,
+                  prefilter_threshold: float = None, passage_budget: int = None,
+                  near_duplicate_threshold: float = None, urls=None, run_key: str = None,
+                  store: ContentStore = None) -> tuple:
+    """Classify every unique document in the store.
+
+    With a prefilter_threshold (prefilter.DEFAULT_THRESHOLD is a starting
+    point) documents scoring below it are rejected without an LLM call;
+    the default, None, sends all of them to the LLM. With a
+    passage_budget (in tokens) the model sees the most relevant passages of
+    each document instead of the whole text. With a near_duplicate_threshold
+    (0.8 is a starting point), documents whose own content, without site
+    menus and footers, is at least that similar (estimated Jaccard over word
+    shingles) are classified once, through the longest of them; the others
+    copy its answer and name it in 'duplicate_of'. The default, None, turns
+    that off.
+
+    `urls` limits the run to those manifest entries, e.g. the pages the
+    current crawl visited, rather than everything ever stored in `directory`.
+    With a `run_key` the run is incremental: the LLM's classifications are
+    kept per run key, model, passage budget and text hash, so only new or
+    changed text reaches the LLM, and the run reports what was new, changed,
+    unchanged or removed since the last run with the same key. Pass `store`
+    to share an open ContentStore for `directory`, e.g. across batch jobs.
+    """
+    store = store or ContentStore(directory)
+    documents = store.documents(urls)
+
+    # The same text served under several URLs is classified once
+    unique_documents = {}
+    for document in documents:
+        unique_documents.setdefault(document['text_hash'] or document['content_hash'], document)
+    logger.info(f"{len(documents)} documents in manifest, {len(unique_documents)} with unique content")
+
+    if run_key:
+        previous = store.run_documents(run_key)
+        current = {document['url']: document['text_hash'] or document['content_hash'] for document in documents}
+        new = sum(url not in previous for url in current)
+        changed = sum(url in previous and previous[url] != text_hash for url, text_hash in current.items())
+        removed = sum(url not in current for url in previous)
+        logger.info(f"Since the last '{run_key}' run: {new} new, {changed} changed, "
+                    f"{len(current) - new - changed} unchanged, {removed} removed")
+
+    prefilter = None
+    if prefilter_threshold is not None or passage_budget:
+        prefilter = Prefilter(issue, city_county, state, threshold=prefilter_threshold or 0.0)
+    hasher = MinHasher() if near_duplicate_threshold is not None else None
+    signatures = []
+    sizes = {}
+
+    # One pass over the texts feeds both the prefilter's statistics and the near-duplicate signatures
+    def scan():
+        for text_hash, document in unique_documents.items():
+            text = extract_text(*load_document(store, document))
+            if hasher:
+                # Pages are compared on their own content; the menus and footers they share say nothing
+                if document['content_type'] == 'text/html':
+                    own_content = main_text(store.read_text(document['content_hash']))
+                else:
+                    own_content = text
+                signatures.append((text_hash, hasher.signature(own_content)))
+                sizes[text_hash] = len(own_content)
+            yield text
+
+    if prefilter:
+        prefilter.fit(scan())
+    elif hasher:
+        for _ in scan():
+            pass
+
+    # Printer-friendly pages, PDF copies of HTML ordinances and the like: the longest copy stands for the rest
+    duplicate_of = {}
+    clusters = cluster_near_duplicates(signatures, near_duplicate_threshold) if hasher else []
+    for cluster in clusters:
+        representative = max(cluster, key=sizes.get)
+        for text_hash in cluster:
+            if text_hash != representative:
+                duplicate_of[text_hash] = representative
+
+    reused = set()
+    # Answers are only reused from a run that asked the same model the same way
+    classifier_key = f"{run_key}|{CLASSIFY_MODEL}|passages={passage_budget}" if run_key else None
+
+    def classify(item):
+        text_hash, document = item
+        stored = store.classification(classifier_key, text_hash) if run_key else None
+        if stored:
+            reused.add(text_hash)
+            return {**stored, 'file_path': store.blob_path(text_hash), 'url': document['url']}
+
+        content, file_type = load_document(store, document)
+        result = process_file(store.blob_path(text_hash), content, file_type, issue, city_county, state,
+                              prefilter, passage_budget)
+        result['url'] = document['url']
+        result['content_hash'] = text_hash
+        result['duplicate_of'] = None
+        store.set_token_count(text_hash, result['token_count'])
+        # Prefilter rejections are not stored, so a lower threshold or none re-checks them
+        if run_key and result['sent_to_llm']:
+            store.set_classification(classifier_key, text_hash, result)
+        return result
+
+    representatives = [item for item in unique_documents.items() if item[0] not in duplicate_of]
+    # Threads only overlap the LLM round trips; map() keeps results in manifest order
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            classified = list(executor.map(classify, representatives))
+    else:
+        classified = [classify(item) for item in representatives]
+
+    by_hash = {result['content_hash']: result for result in classified}
     results = []
-    total_tokens = 0
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(('.html', '.md')):
-                file_path = os.path.join(root, file)
-                file_type = 'html' if file.endswith('.html') else 'markdown'
-                
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                result = process_file(file_path, content, file_type, issue, city_county, state)
-                results.append(result)
-                total_tokens += result['token_count']
-    
+    for text_hash, document in unique_documents.items():
+        if text_hash not in duplicate_of:
+            results.append(by_hash[text_hash])
+            continue
+        token_count = count_tokens(extract_text(*load_document(store, document)))
+        store.set_token_count(text_hash, token_count)
+        results.append({
+            **by_hash[duplicate_of[text_hash]],
+            'file_path': store.blob_path(text_hash),
+            'url': document['url'],
+            'content_hash': text_hash,
+            'token_count': token_count,
+            'tokens_sent': 0,
+            'estimated_cost': 0.0,
+            'prefilter_score': None,
+            'sent_to_llm': 0,
+            'duplicate_of': duplicate_of[text_hash],
+        })
+
+    if run_key:
+        store.save_run(run_key, current)
+        logger.info(f"Reused {len(reused)} classifications, classified {len(classified) - len(reused)}")
+        # Reused results cost nothing this run
+        classified = [result for result in classified if result['content_hash'] not in reused]
+
+    total_tokens = sum(result['token_count'] for result in results)
+    estimated_cost = sum(result['estimated_cost'] for result in classified)
+    if clusters:
+        saved = sum(result['token_count'] for result in results if result['duplicate_of'])
+        logger.info(f"Found {len(clusters)} near-duplicate clusters; skipped classifying {len(duplicate_of)} "
+                    f"documents, ~{saved} LLM tokens")
+    if prefilter_threshold is not None:
+        skipped = sum(not result['sent_to_llm'] for result in classified)
+        logger.info(f"Prefilter rejected {skipped} of {len(classified)} documents, avoiding their LLM calls")
+    if passage_budget:
+        full = sum(result['token_count'] for result in classified if result['sent_to_llm'])
+        sent = sum(result['tokens_sent'] for result in classified)
+        logger.info(f"Sent {sent} tokens of selected passages instead of {full} tokens of full documents "
+                    f"({sent / full if full else 0:.1%})")
+    logger.info(f"Classified {total_tokens} tokens of page text, ~${estimated_cost:.2f} of it sent to the LLM")
     return results, total_tokens
 
-def chunk_content(content: str, max_tokens: int = 100000) -> List[str]:
+def chunk_content(content: str, max_tokens: int = 100000, tokenized: TokenizedText = None) -> List[str]:
     """Split the content into chunks of approximately max_tokens."""
-    encoding = tiktoken.encoding_for_model("gpt-4")
-    tokens = encoding.encode(content)
-    chunks = []
-    
-    for i in range(0, len(tokens), max_tokens):
-        chunk = encoding.decode(tokens[i:i + max_tokens])
-        chunks.append(chunk)
-    
-    return chunks
+    return (tokenized or TokenizedText(content)).chunks(max_tokens)
 
-def call_llm_api(content: str, issue: str, city_county: str, state: str) -> bool:
-    chunks = chunk_content(content)
+def call_llm_api(content: str, issue: str, city_county: str, state: str, tokenized: TokenizedText = None) -> bool:
+    chunks = chunk_content(content, tokenized=tokenized)
     
     for chunk in chunks:
         prompt = f"""
@@ -87,8 +244,11 @@ def call_llm_api(content: str, issue: str, city_county: str, state: str) -> bool
         {chunk}
         """
 
-        response = client.chat.completions.create(
-            model="gpt-4-0125-preview",
+        response = chat_completion(
+            get_client(),
+            rate_limiter,
+            cache=llm_cache,
+            model=CLASSIFY_MODEL,
             messages=[
                 {"role": "system", "content": "You are an assistant that extracts specific information from web page content and formats it as a Python dictionary."},
                 {"role": "user", "content": prompt}
@@ -103,6 +263,60 @@ def call_llm_api(content: str, issue: str, city_county: str, state: str) -> bool
 
     return False
 
+def call_llm_api_passages(tokenized: TokenizedText, issue: str, city_county: str, state: str,
+                          prefilter: Prefilter = None, budget: int = 4000, max_rounds: int = 3) -> tuple:
+    """Classify from the passages most relevant to the issue, within `budget` tokens per request.
+
+    The model may answer 'Uncertain', in which case the next most relevant
+    passages are sent, up to `max_rounds` requests. A document that is still
+    uncertain counts as relevant. Returns (impacts_business, tokens_sent).
+    """
+    text = tokenized.text
+    tokens_per_char = len(tokenized) / len(text) if text else 0.25
+    passages = split_passages(text, tokens_per_char)
+    prefilter = prefilter or Prefilter(issue, city_county, state)
+    remaining = rank_passages(passages, prefilter.score)
+
+    tokens_sent = 0
+    for _ in range(max_rounds):
+        if not remaining:
+            break
+        taken, remaining = take_budget(passages, remaining, tokens_per_char, budget)
+        # Excerpts in document order read more naturally than in score order
+        excerpts = "\n\n[...]\n\n".join(passages[i].strip() for i in sorted(taken))
+        tokens_sent += count_tokens(excerpts)
+        prompt = f"""
+        Do the following excerpts from a page discuss the topic of {issue} ordinances in the {city_county}, {state}? Answer with 'True', 'False' or 'Uncertain' and do not output anything else.
+
+        The excerpts are the parts of the page most likely to be relevant. Answer 'Uncertain' if they are not enough to tell and more of the page should be read.
+
+        It is worse to output a false negative than a false positive.
+
+        Page Excerpts:
+        {excerpts}
+        """
+
+        response = chat_completion(
+            get_client(),
+            rate_limiter,
+            cache=llm_cache,
+            model=CLASSIFY_MODEL,
+            messages=[
+                {"role": "system", "content": "You are an assistant that extracts specific information from web page content and formats it as a Python dictionary."},
+                {"role": "user", "content": prompt}
+            ]
+        )
+
+        result = response.choices[0].message.content.strip().lower()
+        print(f"Passage result: {result}")
+
+        if 'true' in result:
+            return True, tokens_sent
+        if 'false' in result:
+            return False, tokens_sent
+
+    return True, tokens_sent
+
 
 # LLM API function
 def summarize(content, issue, city_county, state):
@@ -117,8 +331,11 @@ def summarize(content, issue, city_county, state):
     {content}
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = chat_completion(
+        get_client(),
+        rate_limiter,
+        cache=llm_cache,
+        model=SUMMARY_MODEL,
         messages=[
             {"role": "system", "content": "You are an assistant that summarizes local ordinance data from a collection of sources."},
             {"role": "user", "content": prompt}
@@ -133,7 +350,8 @@ def summarize(content, issue, city_county, state):
 # CSV output function
 def write_to_csv(results: list, output_file: str):
     with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['file_path', 'impacts_business', 'token_count']  # Changed 'file_name' to 'file_path'
+        fieldnames = ['file_path', 'url', 'content_hash', 'impacts_business', 'token_count', 'tokens_sent',
+                      'estimated_cost', 'prefilter_score', 'sent_to_llm', 'duplicate_of']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
@@ -0,0 +1,77 @@
+import logging
+import threading
+import time
+
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+class MongoHearingSink:
+    """Upserts scraped hearings into `committee-meetings` in batches, keyed by URL.
+
+    Progress is kept in the `offsets` collection as the index of the first
+    hearing not yet written (every hearing before it is), under `job`, so
+    an interrupted run can pick up where the database left off. Indexes
+    are created when the sink is constructed.
+    """
+
+    def __init__(self, db, job, batch_size=500):
+        self.meetings = db['committee-meetings']
+        self.offsets = db['offsets']
+        self.job = job
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = []
+        self.pending_indexes = []
+        self.written_indexes = set()
+        self.offset = self.stored_offset()
+        self.documents = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.meetings.create_index([('url', ASCENDING)], unique=True)
+
+    def stored_offset(self):
+        entry = self.offsets.find_one({'_id': self.job})
+        return entry['offset'] if entry else 0
+
+    def load(self, urls):
+        """Hearings already in the collection, by URL."""
+        return {document['url']: document
+                for document in self.meetings.find({'url': {'$in': list(urls)}}, {'_id': 0})}
+
+    def add(self, index, hearing):
+        """Queue hearing `index` of the job; unscraped hearings only move the offset."""
+        with self.lock:
+            if hearing.get('scraped') and hearing.get('url'):
+                self.pending.append(UpdateOne({'url': hearing['url']}, {'$set': hearing}, upsert=True))
+            self.pending_indexes.append(index)
+            if len(self.pending_indexes) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending_indexes:
+            return
+        start = time.perf_counter()
+        if self.pending:
+            self.meetings.bulk_write(self.pending, ordered=False)
+        # Hearings finish out of order; the offset only moves past an unbroken run of written ones
+        self.written_indexes.update(index for index in self.pending_indexes if index >= self.offset)
+        while self.offset in self.written_indexes:
+            self.written_indexes.remove(self.offset)
+            self.offset += 1
+        self.offsets.update_one({'_id': self.job}, {'$set': {'offset': self.offset, 'updated_at': time.time()}},
+                                upsert=True)
+        self.seconds += time.perf_counter() - start
+        self.documents += len(self.pending)
+        self.batches += 1
+        self.pending = []
+        self.pending_indexes = []
+
+    def report(self):
+        rate = self.documents / self.seconds if self.seconds else 0.0
+        print(f"MongoDB: upserted {self.documents} hearings in {self.batches} batches "
+              f"({rate:.0f} documents/sec), offset {self.offset}")
@@ -1,146 +1,113 @@
 import json
 import requests
+import http_client
 from bs4 import BeautifulSoup
 import time
 import logging
 import os
 from datetime import datetime
 import pytz
-from functools import lru_cache
-from urllib.parse import urlparse
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-from openai import OpenAI
-import re
-import html
+import llm
+import mongo
+from committees import NOT_FOUND, CommitteeDirectory
+from extractors import ExtractionStats, extract_fields, missing_fields
+from minify import fit_token_budget, minify_html
+from sink import MongoHearingSink
+from structured import HearingFields, ParseStats, WitnessList, parse_fields, repair_prompt
+from llm import ResponseCache, chat_completion
 import traceback
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def clean_llm_response_dict(text):
-    text = text.strip()
-    code_block_pattern = r'^```[\w\s]*\n|```$'
-    text = re.sub(code_block_pattern, '', text, flags=re.MULTILINE)
-    text = text.replace('`', '')
-    language_specifiers = ['plaintext', 'json', 'python', 'html', 'javascript']
-    for specifier in language_specifiers:
-        if text.lower().startswith(specifier + '\n'):
-            text = text[len(specifier)+1:]
-    text = text.strip()
-    text = re.sub(r'^[\'"]|[\'"]$', '', text)
-    text = text.replace('\n', '')
-    
-    start_index = text.find('{')
-    end_index = text.rfind('}')
-    
-    if start_index != -1 and end_index != -1 and start_index < end_index:
-        text = text[start_index:end_index+1]
-    else:
-        return ""
-    
-    print()
-    print(text)
-    text = text.replace('\\"', '\\\\"')
-    print()
-    print(text)
-    print()
-    return text
-
-def clean_llm_response_list(text):
-    text = text.strip()
-    code_block_pattern = r'^```[\w\s]*\n|```$'
-    text = re.sub(code_block_pattern, '', text, flags=re.MULTILINE)
-    text = text.replace('`', '')
-    language_specifiers = ['plaintext', 'json', 'python', 'html', 'javascript']
-    for specifier in language_specifiers:
-        if text.lower().startswith(specifier + '\n'):
-            text = text[len(specifier)+1:]
-    text = text.strip()
-    text = re.sub(r'^[\'"]|[\'"]$', '', text)
-    text = text.replace('\n', '')
-    
-    start_index = text.find('[')
-    end_index = text.rfind(']')
-    
-    if start_index != -1 and end_index != -1 and start_index < end_index:
-        text = text[start_index:end_index+1]
-    else:
-        return ""
-
-    return text
-
-def normalize_netloc(url):
-    parsed_url = urlparse(url)
-    netloc = parsed_url.netloc
-    if netloc.startswith("www."):
-        netloc = netloc[4:]
-    return netloc
+def committee_collection():
+    uri = "mongodb+srv://rescript-user:" + os.environ["RESCRIPT_CLUSTER_PASS"] + "@cluster0.uyfwz.mongodb.net/?retryWrites=true&w=majority"
+    return mongo.get_client(uri)['rescript-local']['committeesAndSubcommittees']
 
 class HearingScraper:
-    def __init__(self, retries=3):
+    def __init__(self, retries=3, llm_cache=None, client=None, committees=None, minify=True, max_html_tokens=30000,
+                 extractors=True):
         self.retries = retries
-        self.client = OpenAI()
-        
-    def fetch_page_content(self):
-        for _ in range(self.retries):
-            try:
-                response = requests.get(self.url)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                logger.warning(f"Error fetching page content: {e}. Retrying...")
-        logger.error(f"Failed to fetch page content after {self.retries} attempts.")
-        return None
+        # Parse registered committee sites without the LLM; extractors=False always asks the model
+        self.extractors = extractors
+        self.extraction_stats = ExtractionStats()
+        self.parse_stats = ParseStats()
+        # Page chrome is most of a hearing page's tokens; minify=False sends the page as before
+        self.minify = minify
+        self.max_html_tokens = max_html_tokens
+        self._client = client
+        self._committees = committees
+        self._committees_lock = threading.Lock()
+        self._final_urls = {}
+        self._final_urls_lock = threading.Lock()
+        # Unchanged hearing pages produce the same prompt, so re-runs are answered from disk
+        self.llm_cache = llm_cache if llm_cache is not None else ResponseCache()
+
+    @property
+    def client(self):
+        # The shared OpenAI client unless one was passed in; creating a scraper needs no API key
+        return self._client or llm.get_client()
+
+    @property
+    def committees(self):
+        if self._committees is None:
+            with self._committees_lock:
+                if self._committees is None:
+                    self._committees = CommitteeDirectory(committee_collection())
+        return self._committees
+
+    def fetch_page_content(self, url):
+        try:
+            response = http_client.get(url, max_tries=self.retries)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            logger.error(f"Failed to fetch page content after {self.retries} attempts: {e}")
+            return None
     
     def remove_polygon_and_path_tags(self, html_content):
         soup = BeautifulSoup(html_content, 'html.parser')
         for tag in soup.find_all(['polygon', 'path']):
             tag.decompose()
         return str(soup)
-    
+
+    def prepare_html(self, html_content):
+        if self.minify:
+            html_content = minify_html(html_content)
+        else:
+            html_content = self.remove_polygon_and_path_tags(html_content)
+        if self.max_html_tokens:
+            html_content = fit_token_budget(html_content, self.max_html_tokens)
+        return html_content
+
     def get_final_url(self, url):
-        response = requests.get(url, allow_redirects=True)
-        return response.url
+        """Resolve redirects once per URL per scraper; hearings resolving the same URL at once share the request."""
+        with self._final_urls_lock:
+            future = self._final_urls.get(url)
+            owner = future is None
+            if owner:
+                future = self._final_urls[url] = Future()
+        if owner:
+            try:
+                future.set_result(http_client.final_url(url))
+            except Exception as e:
+                with self._final_urls_lock:
+                    del self._final_urls[url]  # let a later hearing try again
+                future.set_exception(e)
+        return future.result()
 
-    @lru_cache(maxsize=128)
-    def get_committee(self): 
-        uri = "mongodb+srv://rescript-user:" + os.environ["RESCRIPT_CLUSTER_PASS"] + "@cluster0.uyfwz.mongodb.net/?retryWrites=true&w=majority"
-        client = MongoClient(uri, server_api=ServerApi('1'))
+    def get_committee(self, url):
         try:
-            client.admin.command('ping')
-            db = client['rescript-local']
-            committee_collection = db['committeesAndSubcommittees']
+            return self.committees.lookup(url)
         except Exception as e:
             logger.error(f"Error connecting to MongoDB: {e}")
-            return {"committee_id": None, "committee": None, "subcommittee_dict": None}
-
-        if "cha.house.gov" in self.url:
-            committees = committee_collection.find({"thomas_id": "HSHA"})
-        else:
-            committees = committee_collection.find({})
-        for committee in committees:
-            if any(url_key in committee for url_key in ["url", "minority_url"]):
-                if any(
-                    committee.get(url_key) and (normalize_netloc(committee[url_key]) == normalize_netloc(self.url))
-                    for url_key in ["url", "minority_url"]
-                ):
-                    subcommittee_dict = {
-                        subcommittee["name"]: subcommittee["thomas_id"]
-                        for subcommittee in committee.get("subcommittees", [])
-                    }
-                    subcommittee_dict["Full Committee"] = ""
-                    return {
-                        "committee_id": committee["thomas_id"],
-                        "committee": committee["name"],
-                        "subcommittee_dict": subcommittee_dict
-                    }
-                
-        return {"committee_id": None, "committee": None, "subcommittee_dict": None}
+            return dict(NOT_FOUND)
 
     def get_consolidated_llm_response(self, html_content, committee_info):
         prompt = f"""
-        Extract the following information from the given HTML content of a Senate hearing page. Return the result as a json.loads-readable Python dictionary with the following keys:
+        Extract the following information from the given HTML content of a Senate hearing page. Return the result as a JSON object with the following keys:
 
         1. title: The title of the hearing as a string.
         2. video_link: The main hearing video link as a string. This may be in the src attribute of an iframe, or it may be an embedding youtube link. For example, it could be the src in an iframe like this: '<iframe allowfullscreen class="embed-responsive-item" src="https://www.senate.gov/isvp/?type=arch&comm=commerce&filename=commerce071223&auto_play=false&amp;wmode=opaque" width="320" height="240" frameborder="0"></iframe>'. If there are multiple, take the first link. If the HTML content is from an hsgac.senate.gov or indian.senate.gov page with an 'archive_stream' variable, simply output 'url'. If the hearing is a "Committee on House Administration," output the HREF link.
@@ -171,52 +138,57 @@ class HearingScraper:
         {html_content}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an assistant that extracts specific information from web page content and formats it as a Python dictionary."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        return self.get_structured_response(prompt, HearingFields)
 
-        try:
-            string_response = clean_llm_response_dict(response.choices[0].message.content)
-            print("string response", string_response)
-            string_response = html.unescape(string_response).encode('utf-8').decode('unicode-escape')
-            extracted_data = json.loads(string_response)
-            return extracted_data
-        except json.JSONDecodeError:
-            logger.error("Failed to parse LLM response as JSON")
-            return {}
-        
     def get_witnesses_llm_response(self, html_content):
         prompt = f"""
-        Extract the witnesses from the congressional hearing HTML content as a list of strings, each containing the witness's name, title, and organization (if available).
+        Extract the witnesses from the congressional hearing HTML content as a JSON object whose "witnesses" key is a list of strings, each containing the witness's name, title, and organization (if available).
 
         Example output format:
-        ["The Honorable Christopher Coes, Acting Under Secretary of Transportation for Policy, United States Department of Transportation", 
-        "Mr. Michael Knisley, Executive Secretary-Treasurer, Ohio State Building and Construction Trades Council"]
+        {{"witnesses": ["The Honorable Christopher Coes, Acting Under Secretary of Transportation for Policy, United States Department of Transportation",
+        "Mr. Michael Knisley, Executive Secretary-Treasurer, Ohio State Building and Construction Trades Council"]}}
     
         HTML Content:
         {html_content}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an assistant that extracts specific information from web page content and formats it as a Python dictionary."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        try:
-            string_response = clean_llm_response_list(response.choices[0].message.content)
-            string_response = html.unescape(string_response).encode('utf-8').decode('unicode-escape')
-            extracted_data = json.loads(string_response)
-            return extracted_data
-        except json.JSONDecodeError:
-            logger.error("Failed to parse LLM response as JSON")
-            return {}
+        return self.get_structured_response(prompt, WitnessList)['witnesses']
+
+    def get_structured_response(self, prompt, schema):
+        """Ask for a JSON object, validate it against `schema`, and re-ask only for the fields that failed."""
+        messages = [
+            {"role": "system", "content": "You are an assistant that extracts specific information from web page content and replies with a JSON object."},
+            {"role": "user", "content": prompt}
+        ]
+        response = chat_completion(self.client, cache=self.llm_cache, model="gpt-4o-mini",
+                                   response_format={"type": "json_object"}, messages=messages)
+        content = response.choices[0].message.content
+        fields, invalid, raw = parse_fields(schema, content)
+        self.parse_stats.record(bool(invalid))
+        if not invalid:
+            return fields
+
+        logger.warning(f"Invalid fields in LLM response, asking again for: {', '.join(invalid)}")
+        # The page and the first reply go back with the repair request, so the model corrects from the page
+        # instead of making up a year, a time or a title
+        repair_messages = messages + [{"role": "assistant", "content": content or ""},
+                                      {"role": "user", "content": repair_prompt(schema, invalid, raw)}]
+        response = chat_completion(self.client, cache=self.llm_cache, model="gpt-4o-mini",
+                                   response_format={"type": "json_object"}, messages=repair_messages)
+        repaired, still_invalid, repaired_raw = parse_fields(schema, response.choices[0].message.content)
+        if repaired is None:
+            logger.error("Repair response was not a JSON object either; using defaults for the invalid fields")
+            self.parse_stats.record_failure()
+            return fields if fields is not None else schema().model_dump()
+        if fields is None:
+            fields = repaired
+        else:
+            for field in invalid:
+                if field in repaired_raw and field not in still_invalid:
+                    fields[field] = repaired[field]
+        if still_invalid:
+            self.parse_stats.record_failure()
+        return fields
 
     def convert_est_to_utc(self, date_string):
         try:
@@ -229,11 +201,28 @@ class HearingScraper:
             logger.error(f"Error converting date: {e}")
             return date_string
 
-    def extract_data(self, html_content, committee_info):
-        llm_start = time.time()
-        data = self.get_consolidated_llm_response(html_content, committee_info)
-        llm_end = time.time()
-        logger.info(f"LLM response time: {llm_end - llm_start:.2f} seconds")
+    def extract_data(self, html_content, committee_info, url=None):
+        start = time.time()
+        # Known sites are parsed directly; the LLM only fills what the parser could not find
+        fields = extract_fields(html_content, url, committee_info) if self.extractors and url else None
+        missing = missing_fields(fields)
+        if fields is not None and not missing:
+            data, outcome = fields, 'bypassed'
+        elif fields is not None and missing == ['witnesses']:
+            data = {**fields, 'witnesses': self.get_witnesses_llm_response(self.prepare_html(html_content))}
+            outcome = 'partial'
+        else:
+            llm_start = time.time()
+            data = self.get_consolidated_llm_response(self.prepare_html(html_content), committee_info)
+            llm_end = time.time()
+            logger.info(f"LLM response time: {llm_end - llm_start:.2f} seconds")
+            # The parser only fills what the model left empty; it never overrides the model's answers
+            for key, value in (fields or {}).items():
+                if not data.get(key):
+                    data[key] = value
+            outcome = 'partial' if fields else 'llm'
+        if url:
+            self.extraction_stats.record(url, outcome, time.time() - start)
         print(data)
 
         if data['subcommittee'] == 'Full Committee':
@@ -247,7 +236,7 @@ class HearingScraper:
 
         return data
 
-    def validate_and_set_defaults(self, data, committee_info):
+    def validate_and_set_defaults(self, data, committee_info, url, html_content=None):
         if not isinstance(data, dict):
             data = {}
 
@@ -267,31 +256,32 @@ class HearingScraper:
             data.setdefault(key, default_value)
 
         data["witnesses"] = [witness if isinstance(witness, str) else "" for witness in data["witnesses"]]
-        data["url"] = self.url
+        data["url"] = url
         data["thomas_id"] = data["committee_id"] + data["subcommittee_id"]
         data["video_link"] = data["video_link"].lstrip('/')
         if data["video_link"] != "url":
-            if data["video_link"][0:4] != "http" or data["video_link"][0:5] != "https":
+            if not data["video_link"].startswith(("http://", "https://")):
                 data["video_link"] = "https://" + data["video_link"]
             data["video_link"] = self.get_final_url(data["video_link"])
 
-        if "veterans.house.gov" in self.url:
-            response = requests.get(self.url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+        if "veterans.house.gov" in url:
+            if html_content is None:
+                response = http_client.get(url)
+                response.raise_for_status()
+                html_content = response.text
+            soup = BeautifulSoup(html_content, 'html.parser')
             href = soup.find('a', string='here')['href']
-            response2 = requests.get(href)
-            data["witnesses"] = self.get_witnesses_llm_response(response2.text)
+            response2 = http_client.get(href)
+            data["witnesses"] = self.get_witnesses_llm_response(self.prepare_html(response2.text))
 
         return data
 
-    def scrape(self):
-        html_content = self.fetch_page_content()
+    def scrape(self, url):
+        html_content = self.fetch_page_content(url)
         if html_content:
-            html_content = self.remove_polygon_and_path_tags(html_content)
-            committee_info = self.get_committee()
-            data = self.extract_data(html_content, committee_info)
-            validated_data = self.validate_and_set_defaults(data, committee_info)
+            committee_info = self.get_committee(url)
+            data = self.extract_data(html_content, committee_info, url)
+            validated_data = self.validate_and_set_defaults(data, committee_info, url, html_content)
             validated_data["scraped"] = True
             return validated_data
         return None
@@ -309,63 +299,133 @@ class HearingScraper:
         existing_data["scraped"] = True
         return existing_data
 
-    def process_hearings(self, input_file, output_file):
+    def process_hearing(self, hearing, position=""):
+        """Scrape one hearing and return it updated; failures are marked rather than raised."""
+        url = hearing.get("url")
+        if not url:
+            logger.warning(f"Skipping hearing without URL: {hearing}")
+            hearing["scraped"] = False
+            return hearing
+        try:
+            logger.info(f"Processing hearing {position}: {url}")
+            new_data = self.scrape(url)
+            if new_data:
+                return self.update_hearing_data(hearing, new_data)
+            logger.warning(f"Failed to scrape data for {url}")
+            hearing["scraped"] = False
+        except Exception as e:
+            logger.error(f"Error processing hearing {position}: {e}")
+            logger.error(traceback.format_exc())
+            hearing["scraped"] = False
+            hearing["error"] = str(e)
+        return hearing
+
+    def load_checkpoint(self, checkpoint_file, hearings):
+        """Hearings already scraped by an interrupted run, by index. Later lines win."""
+        done = {}
+        try:
+            with open(checkpoint_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    index = entry["index"]
+                    # Ignore entries that no longer line up with the input file
+                    if index < len(hearings) and hearings[index].get("url") == entry["hearing"].get("url"):
+                        done[index] = entry["hearing"]
+        except OSError:
+            pass
+        return {index: hearing for index, hearing in done.items() if hearing.get("scraped")}
+
+    def process_hearings(self, input_file, output_file, concurrency=1, checkpoint_file=None, sink=None):
+        """Scrape every hearing in `input_file` not already scraped and write them all to `output_file`.
+
+        Up to `concurrency` hearings are scraped at once. Each finished hearing
+        is appended to a JSONL checkpoint (`output_file` + '.checkpoint.jsonl'
+        by default), which a rerun resumes from; the checkpoint is compacted
+        into `output_file` at the end and removed. With a sink.MongoHearingSink,
+        hearings are also upserted to MongoDB, and hearings before the sink's
+        stored offset are read back from it instead of being scraped again.
+        """
         with open(input_file, 'r') as f:
             hearings = json.load(f)
-
-        updated_hearings = []
+        checkpoint_file = checkpoint_file or output_file + '.checkpoint.jsonl'
+
+        resumed = self.load_checkpoint(checkpoint_file, hearings)
+        if resumed:
+            logger.info(f"Resuming: {len(resumed)} hearings already scraped in {checkpoint_file}")
+        offset = sink.offset if sink is not None else 0
+        stored = {}
+        if offset:
+            stored = sink.load(hearing["url"] for hearing in hearings[:offset] if hearing.get("url"))
+            logger.info(f"{len(stored)} hearings before offset {offset} are already in MongoDB")
+        updated_hearings = list(hearings)
+        pending = []
         for index, hearing in enumerate(hearings):
-            try:
-                if hearing.get("scraped", False) and hearing.get("video_link", "") != "url":
-                    logger.info(f"Skipping already scraped hearing {index + 1}/{len(hearings)}: {hearing.get('url', 'No URL')}")
-                    updated_hearings.append(hearing)
-                    continue
-
-                url = hearing.get("url")
-                if url:
-                    self.url = url
-                    logger.info(f"Processing hearing {index + 1}/{len(hearings)}: {url}")
-                    new_data = self.scrape()
-                    if new_data:
-                        updated_hearing = self.update_hearing_data(hearing, new_data)
-                        updated_hearings.append(updated_hearing)
-                    else:
-                        logger.warning(f"Failed to scrape data for {url}")
-                        hearing["scraped"] = False
-                        updated_hearings.append(hearing)
-                else:
-                    logger.warning(f"Skipping hearing without URL: {hearing}")
-                    hearing["scraped"] = False
-                    updated_hearings.append(hearing)
-
-                # Save progress after each hearing
-                if (index + 1) % 5 == 0 or index == len(hearings) - 1:
-                    with open(output_file, 'w') as f:
-                        json.dump(updated_hearings, f, indent=2)
-                    logger.info(f"Progress saved: {index + 1}/{len(hearings)} hearings processed")
-
-            except Exception as e:
-                logger.error(f"Error processing hearing {index + 1}/{len(hearings)}: {e}")
-                logger.error(f"Error: {e}")
-                logger.error(traceback.format_exc())
-                hearing["scraped"] = False
-                hearing["error"] = str(e)
-                updated_hearings.append(hearing)
-                
-                # Save progress after an error
-                with open(output_file, 'w') as f:
-                    json.dump(updated_hearings, f, indent=2)
-                logger.info(f"Progress saved after error: {index + 1}/{len(hearings)} hearings processed")
-
-        # Final save
-        with open(output_file, 'w') as f:
+            if index in resumed:
+                updated_hearings[index] = resumed[index]
+            elif index < offset and hearing.get("url") in stored:
+                updated_hearings[index] = {**hearing, **stored[hearing["url"]]}
+            elif hearing.get("scraped", False) and hearing.get("video_link", "") != "url":
+                logger.info(f"Skipping already scraped hearing {index + 1}/{len(hearings)}: {hearing.get('url', 'No URL')}")
+            else:
+                pending.append(index)
+                continue
+            if sink is not None and index >= offset:
+                # May not have reached MongoDB before an interruption; upserting again is harmless
+                sink.add(index, updated_hearings[index])
+
+        start = time.time()
+        checkpoint_bytes = 0
+        with open(checkpoint_file, 'a') as checkpoint, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(self.process_hearing, hearings[index], f"{index + 1}/{len(hearings)}"): index
+                for index in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                updated_hearings[index] = future.result()
+                line = json.dumps({"index": index, "hearing": updated_hearings[index]}) + '\n'
+                checkpoint.write(line)
+                checkpoint.flush()
+                checkpoint_bytes += len(line.encode('utf-8'))
+                if sink is not None:
+                    sink.add(index, updated_hearings[index])
+                if done % 5 == 0 or done == len(futures):
+                    logger.info(f"Progress saved: {done}/{len(futures)} hearings processed")
+
+        if sink is not None:
+            sink.flush()
+            sink.report()
+
+        # Compact: write the full JSON once, atomically, then drop the checkpoint
+        temporary_file = output_file + '.tmp'
+        with open(temporary_file, 'w') as f:
             json.dump(updated_hearings, f, indent=2)
+        os.replace(temporary_file, output_file)
+        os.remove(checkpoint_file)
 
+        minutes = (time.time() - start) / 60
+        rate = len(pending) / minutes if minutes else 0.0
         logger.info(f"All hearings processed. Results saved to {output_file}")
+        logger.info(f"Scraped {len(pending)} hearings in {minutes * 60:.0f}s ({rate:.1f} hearings/minute), "
+                    f"wrote {checkpoint_bytes} checkpoint bytes")
+        self.extraction_stats.report()
+        self.parse_stats.report()
+        self.llm_cache.report()
+        return {"hearings": len(pending), "seconds": minutes * 60, "hearings_per_minute": rate,
+                "checkpoint_bytes": checkpoint_bytes}
 
 if __name__ == "__main__":
     input_file = 'House/Armed_Scraped.json'  # Replace with your input file name
     output_file = 'House/Armed_Scraped.json'  # Replace with your desired output file name
 
+    sink = None
+    if os.environ.get('MONGO_DB_NAME'):
+        # Also upsert into committee-meetings; browse.get_db reads the MongoDB credentials
+        from browse import get_db
+        sink = MongoHearingSink(get_db(), job=input_file)
+
     scraper = HearingScraper()
-    scraper.process_hearings(input_file, output_file)
\ No newline at end of file
+    scraper.process_hearings(input_file, output_file, concurrency=8, sink=sink)
\ No newline at end of file
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+class ContentStore:
+    """Crawled documents stored once per unique body, plus a manifest of where they came from.
+
+    Blobs live under `<root>/blobs/<first two hex chars>/<sha256>` (with a
+    `.zst` suffix when compressed). `<root>/manifest.sqlite` maps each URL to
+    the hash of its stored body, the hash of its extracted text, the content
+    type, fetch time and token count. Identical pages served under several URLs
+    share one blob and one text hash.
+
+    The manifest also keeps what incremental runs need: the hash of the PDF a
+    markdown document was converted from, which URLs (and text hashes) each
+    run covered, and each run's classification and summary of each text
+    hash. A run is named by a key such as the issue and jurisdiction.
+    """
+
+    def __init__(self, root='crawled_pages', compress=False):
+        if compress and zstandard is None:
+            raise ImportError("ContentStore(compress=True) needs the zstandard package")
+        self.root = root
+        self.compress = compress
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, 'manifest.sqlite'), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                text_hash TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                token_count INTEGER
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS documents_text_hash ON documents (text_hash)")
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(documents)")}
+        if 'source_hash' not in columns:
+            self.db.execute("ALTER TABLE documents ADD COLUMN source_hash TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS documents_source_hash ON documents (source_hash)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS run_documents (
+                run_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                PRIMARY KEY (run_key, url)
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS classifications (
+                run_key TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                classified_at REAL,
+                PRIMARY KEY (run_key, text_hash)
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                run_key TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                summaries TEXT NOT NULL,
+                summarized_at REAL,
+                PRIMARY KEY (run_key, text_hash)
+            )
+        """)
+        self.db.commit()
+
+    def blob_path(self, digest):
+        path = os.path.join(self.root, 'blobs', digest[:2], digest)
+        if os.path.exists(path + '.zst'):
+            return path + '.zst'
+        return path
+
+    def _write_blob(self, digest, copy):
+        # `copy(dest)` writes the raw body to an open binary file
+        path = os.path.join(self.root, 'blobs', digest[:2], digest)
+        if os.path.exists(path) or os.path.exists(path + '.zst'):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.compress:
+            path += '.zst'
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            if self.compress:
+                with zstandard.ZstdCompressor().stream_writer(f, closefd=False) as writer:
+                    copy(writer)
+            else:
+                copy(f)
+        os.replace(tmp, path)
+
+    def put(self, data):
+        """Store bytes or str (as UTF-8) and return the SHA-256 hex digest."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        self._write_blob(digest, lambda dest: dest.write(data))
+        return digest
+
+    def put_file(self, path, chunk_size=1024 * 1024):
+        """Store a file's contents without reading it into memory at once."""
+        digest = file_sha256(path, chunk_size)
+
+        def copy(dest):
+            with open(path, 'rb') as src:
+                shutil.copyfileobj(src, dest, chunk_size)
+
+        self._write_blob(digest, copy)
+        return digest
+
+    def read(self, digest):
+        path = self.blob_path(digest)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.endswith('.zst'):
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def read_text(self, digest):
+        return self.read(digest).decode('utf-8')
+
+    def record(self, url, content_hash, content_type, text_hash=None, size=None, source_hash=None):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO documents (url, content_hash, content_type, text_hash, size, fetched_at, "
+                "source_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content_hash, content_type, text_hash, size, time.time(), source_hash),
+            )
+            self.db.commit()
+
+    def set_token_count(self, text_hash, token_count):
+        with self.lock:
+            self.db.execute("UPDATE documents SET token_count = ? WHERE text_hash = ?", (token_count, text_hash))
+            self.db.commit()
+
+    def documents(self, urls=None):
+        """Manifest entries, optionally only those for `urls`."""
+        with self.lock:
+            cursor = self.db.execute(
+                "SELECT url, content_hash, content_type, text_hash, size, fetched_at, token_count, source_hash "
+                "FROM documents ORDER BY url"
+            )
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        if urls is not None:
+            urls = set(urls)
+            rows = [row for row in rows if row['url'] in urls]
+        return rows
+
+    def converted_from(self, source_hash):
+        """Manifest entry of a markdown document already converted from this source, if its blob still exists."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT content_hash, size FROM documents WHERE source_hash = ? LIMIT 1", (source_hash,)
+            ).fetchone()
+        if row and os.path.exists(self.blob_path(row[0])):
+            return {'content_hash': row[0], 'size': row[1]}
+        return None
+
+    def run_documents(self, run_key):
+        """{url: text_hash} as of the last save_run() for `run_key`."""
+        with self.lock:
+            rows = self.db.execute("SELECT url, text_hash FROM run_documents WHERE run_key = ?", (run_key,))
+            return dict(rows.fetchall())
+
+    def save_run(self, run_key, url_hashes):
+        with self.lock:
+            self.db.execute("DELETE FROM run_documents WHERE run_key = ?", (run_key,))
+            self.db.executemany(
+                "INSERT INTO run_documents (run_key, url, text_hash) VALUES (?, ?, ?)",
+                [(run_key, url, text_hash) for url, text_hash in url_hashes.items()],
+            )
+            self.db.commit()
+
+    def classification(self, run_key, text_hash):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT result FROM classifications WHERE run_key = ? AND text_hash = ?", (run_key, text_hash)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_classification(self, run_key, text_hash, result):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO classifications (run_key, text_hash, result, classified_at) VALUES (?, ?, ?, ?)",
+                (run_key, text_hash, json.dumps(result), time.time()),
+            )
+            self.db.commit()
+
+    def summary(self, run_key, text_hash):
+        """The chunk summaries a run made of this text, or None."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT summaries FROM summaries WHERE run_key = ? AND text_hash = ?", (run_key, text_hash)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_summary(self, run_key, text_hash, summaries):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO summaries (run_key, text_hash, summaries, summarized_at) VALUES (?, ?, ?, ?)",
+                (run_key, text_hash, json.dumps(summaries), time.time()),
+            )
+            self.db.commit()
+
+    def save_page(self, url, html, text=None):
+        content_hash = self.put(html)
+        text_hash = self.put(text) if text is not None else None
+        self.record(url, content_hash, 'text/html', text_hash, len(html))
+        return content_hash
+
+    def save_markdown_file(self, url, md_path, source_hash=None):
+        content_hash = self.put_file(md_path)
+        self.record(url, content_hash, 'text/markdown', content_hash, os.path.getsize(md_path), source_hash)
+        return content_hash
+
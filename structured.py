@@ -0,0 +1,117 @@
+import html
+import json
+import threading
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+DATE_TIME_FORMAT = '%m/%d/%y %I:%M%p'
+
+def witness_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [html.unescape(item) if isinstance(item, str) else item for item in value]
+    return value
+
+class HearingFields(BaseModel):
+    """The fields get_consolidated_llm_response asks the model for."""
+
+    title: str = Field("", description="the title of the hearing")
+    video_link: str = Field("", description="the main hearing video link, or 'url'")
+    subcommittee: str = Field("Full Committee", description="one of the listed subcommittee names or 'Full Committee'")
+    subcommittee_id: str = Field("", description="the id of that subcommittee, or '' for the full committee")
+    location: str = Field("", description="where the hearing is held, or ''")
+    witnesses: List[str] = Field([], description="a list of strings, one per witness")
+    date_time: str = Field("", description="the date and time as '%m/%d/%y %I:%M%p', e.g. '07/31/24 10:00AM'")
+
+    @field_validator('title', 'video_link', 'subcommittee', 'subcommittee_id', 'location', 'date_time', mode='before')
+    @classmethod
+    def text(cls, value):
+        # Models answer null for "not on the page"; entities come through from the HTML
+        if value is None:
+            return ''
+        return html.unescape(value) if isinstance(value, str) else value
+
+    @field_validator('witnesses', mode='before')
+    @classmethod
+    def witnesses_before(cls, value):
+        return witness_list(value)
+
+    @field_validator('date_time')
+    @classmethod
+    def date_time_format(cls, value):
+        if value:
+            datetime.strptime(value, DATE_TIME_FORMAT)
+        return value
+
+class WitnessList(BaseModel):
+    """The reply to get_witnesses_llm_response."""
+
+    witnesses: List[str] = Field([], description="a list of strings, one per witness")
+
+    @field_validator('witnesses', mode='before')
+    @classmethod
+    def witnesses_before(cls, value):
+        return witness_list(value)
+
+def parse_fields(schema, content):
+    """Validate a JSON reply against `schema` in one pass.
+
+    Returns (fields, invalid, raw): every field, with defaults standing in
+    for the invalid and missing ones; {field: error} for the invalid ones;
+    and the keys the reply actually held, with their values as sent. If
+    the reply is not a JSON object at all, fields and raw are None and
+    invalid holds '__all__'.
+    """
+    try:
+        parsed = schema.model_validate_json(content or '')
+        fields = parsed.model_dump()
+        return fields, {}, {key: fields[key] for key in parsed.model_fields_set}
+    except ValidationError as e:
+        errors = e.errors()
+    try:
+        raw = json.loads(content or '')
+    except ValueError:
+        raw = None
+    if not isinstance(raw, dict):
+        return None, {'__all__': errors[0]['msg']}, None
+    invalid = {str(error['loc'][0]): error['msg'] for error in errors if error['loc']}
+    valid = {key: value for key, value in raw.items() if key not in invalid}
+    return schema.model_validate(valid).model_dump(), invalid, raw
+
+def repair_prompt(schema, invalid, raw):
+    """A short follow-up asking again for only the fields that failed validation."""
+    if '__all__' in invalid:
+        keys = ', '.join(schema.model_fields)
+        return f"That reply was not a valid JSON object ({invalid['__all__']}). Reply with only a JSON object with the keys {keys}."
+    lines = []
+    for field, error in invalid.items():
+        description = schema.model_fields[field].description if field in schema.model_fields else ''
+        lines.append(f"- {field}: {json.dumps(raw.get(field))} is invalid ({error}); it must be {description}")
+    return ("These fields of your JSON reply were invalid:\n" + '\n'.join(lines) +
+            "\nReply with a JSON object containing only these keys, corrected.")
+
+class ParseStats:
+    """How many LLM replies parsed first time, needed a repair call, or stayed invalid."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.replies = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def record(self, needed_repair):
+        with self.lock:
+            self.replies += 1
+            self.repaired += needed_repair
+
+    def record_failure(self):
+        with self.lock:
+            self.failed += 1
+
+    def report(self):
+        if self.replies:
+            print(f"LLM replies: {self.replies}, {self.repaired / self.replies:.1%} needed a repair call, "
+                  f"{self.failed} still invalid after it")
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tokens import TokenizedText, count_lines
+
+def iter_chunks(texts, max_tokens=100000):
+    """Pack the lines of several documents into chunks of at most ~max_tokens, one document at a time."""
+    current = []
+    current_tokens = 0
+    for text in texts:
+        lines = []
+        for line in text.split('\n'):
+            # A line longer than a chunk (PDF text without line breaks) is split where the tokens run out
+            lines.extend(TokenizedText(line).chunks(max_tokens - 1) if len(line) >= max_tokens else [line])
+        lines += ['', '']  # documents are separated by a blank line
+        for line, line_tokens in zip(lines, count_lines(lines)):
+            line_tokens += 1  # the newline joining it to the next line
+            if current and current_tokens + line_tokens > max_tokens:
+                chunk = '\n'.join(current).strip()
+                if chunk:
+                    yield chunk
+                current = []
+                current_tokens = 0
+            current.append(line)
+            current_tokens += line_tokens
+    chunk = '\n'.join(current).strip()
+    if chunk:
+        yield chunk
+
+def group_for_reduce(summaries, max_tokens, fan_in):
+    """Consecutive groups of at most `fan_in` summaries whose combined size fits in `max_tokens`.
+
+    A summary longer than half the budget is cut to that length first, so any
+    two fit together and every level at least halves the count.
+    """
+    limit = max_tokens // 2 - 1  # one token left for the blank line joining two summaries
+    groups = []
+    current = []
+    current_tokens = 0
+    for summary in summaries:
+        tokenized = TokenizedText(summary)
+        if len(tokenized) > limit:
+            print(f"Cutting a {len(tokenized)}-token summary to {limit} tokens to fit the reduce budget")
+            summary = tokenized.chunks(limit)[0]
+            tokenized = TokenizedText(summary)
+        tokens = len(tokenized) + 1
+        if current and (len(current) == fan_in or current_tokens + tokens > max_tokens):
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def summarize_documents(documents, summarize, max_tokens=100000, fan_in=8, concurrency=8, stored=None, save=None):
+    """Map-reduce summary of an iterable of (key, text) documents.
+
+    `summarize(text)` is called concurrently on the chunks of each document,
+    then on groups of up to `fan_in` summaries joined together, level by
+    level, until one summary is left. Every call's input fits in
+    `max_tokens`, including the last one; a summary too long to pair with
+    another is cut short.
+
+    Chunks never span documents, so a document's chunk summaries depend on
+    its text alone. `stored(key)` may return them from an earlier run
+    (skipping the document) and `save(key, summaries)` records new ones.
+    Returns (summary, levels), where levels holds each level's input count,
+    output count and seconds.
+    """
+    levels = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Chunks are submitted as they are read, so summarizing starts before the last document is loaded
+        start = time.perf_counter()
+        pending = []
+        reused = 0
+        for key, text in documents:
+            known = stored(key) if stored else None
+            if known is not None:
+                reused += 1
+                pending.append((key, None, known))
+            else:
+                pending.append((key, [executor.submit(summarize, chunk) for chunk in iter_chunks([text], max_tokens)],
+                                None))
+        summaries = []
+        for key, futures, known in pending:
+            if futures is not None:
+                known = [future.result() for future in futures]
+                if save:
+                    save(key, known)
+            summaries.extend(known)
+        levels.append({'level': 0, 'inputs': len(pending), 'outputs': len(summaries),
+                       'seconds': time.perf_counter() - start})
+        print(f"Summary level 0: {len(pending)} documents, {reused} summarized in an earlier run, "
+              f"{len(summaries)} chunk summaries in {levels[-1]['seconds']:.1f}s")
+
+        while len(summaries) > 1:
+            start = time.perf_counter()
+            groups = group_for_reduce(summaries, max_tokens, fan_in)
+            summaries = list(executor.map(summarize, ("\n\n".join(group) for group in groups)))
+            levels.append({'level': len(levels), 'inputs': sum(len(group) for group in groups),
+                           'outputs': len(summaries), 'seconds': time.perf_counter() - start})
+            print(f"Summary level {levels[-1]['level']}: {levels[-1]['inputs']} summaries reduced to "
+                  f"{len(summaries)} in {levels[-1]['seconds']:.1f}s")
+
+    return (summaries[0] if summaries else ''), levels
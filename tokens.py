@@ -0,0 +1,53 @@
+import os
+from functools import lru_cache
+
+import tiktoken
+
+from llm import estimate_cost
+
+ENCODING_NAME = "cl100k_base"  # what tiktoken uses for gpt-4, gpt-4-turbo and gpt-3.5
+
+@lru_cache(maxsize=None)
+def get_encoding(name=ENCODING_NAME):
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.get_encoding(name)
+
+def encode(text):
+    # encode_ordinary treats '<|endoftext|>' in scraped text as plain text instead of raising
+    return get_encoding().encode_ordinary(text)
+
+def count_tokens(text):
+    return len(encode(text))
+
+def count_lines(lines):
+    """Token count of each line. Repeated lines (blank lines, table rules) are encoded once."""
+    encoding = get_encoding()
+    unique = list(dict.fromkeys(lines))
+    # encode_ordinary_batch fans out over threads; with one core its per-line overhead costs more than it saves
+    threads = os.cpu_count() or 1
+    if threads > 1:
+        counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(unique, num_threads=threads)]
+    else:
+        counts = [len(encoding.encode_ordinary(line)) for line in unique]
+    by_line = dict(zip(unique, counts))
+    return [by_line[line] for line in lines]
+
+class TokenizedText:
+    """A document encoded once; counting, chunking and pricing reuse the same token list."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = encode(text)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def chunks(self, max_tokens=100000):
+        if len(self.tokens) <= max_tokens:
+            return [self.text]
+        encoding = get_encoding()
+        return [encoding.decode(self.tokens[i:i + max_tokens]) for i in range(0, len(self.tokens), max_tokens)]
+
+    def cost(self, model):
+        """Estimated dollars to send this text as a prompt to `model`."""
+        return estimate_cost(model, len(self.tokens), 0)